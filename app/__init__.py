@@ -4,13 +4,20 @@ from flask_cors import CORS
 def create_app():
 
     app = Flask(__name__)
+    # FLASK_* environment variables, e.g. FLASK_HAND_INFERENCE_WORKERS=4
+    app.config.from_prefixed_env()
     CORS(app)
 
     from app.routes.index import main
     from app.routes.balloons import game
     from app.routes.hand_api import api
+    from app.routes import hand_stream  # WebSocket routes on the api blueprint
+    from app.routes.metrics import metrics
+    from app.routes.sockets import sock
+    sock.init_app(app)
     app.register_blueprint(main)
     app.register_blueprint(game)
     app.register_blueprint (api)
+    app.register_blueprint(metrics)
 
     return app
\ No newline at end of file
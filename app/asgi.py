@@ -0,0 +1,232 @@
+import asyncio
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Callable, Optional
+
+from a2wsgi import WSGIMiddleware
+from flask import Flask
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Mount, Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from app import create_app
+from app.routes import balloons, hand_api
+from app.services.admission import FrameRejected
+from app.services.metrics import rejected_frames, stage_seconds
+
+
+class DetectionExecutor:
+    def __init__(self, flask_app: Flask, max_workers: int):
+        """
+        Run blocking detection calls off the event loop, in a bounded pool.
+
+        Calls beyond the pool size are rejected at once instead of queueing,
+        so the event loop keeps accepting connections while every thread is
+        busy. Each call runs inside the Flask app context, like a request.
+
+        Args:
+            flask_app: App whose config and extensions the calls use
+            max_workers: Threads running detection calls
+        """
+        self.flask_app = flask_app
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='detect')
+        self._busy = 0
+
+    def _call(self, fn: Callable, args, kwargs):
+        with self.flask_app.app_context():
+            return fn(*args, **kwargs)
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Call fn(*args, **kwargs) on the pool and wait for its result.
+
+        Raises:
+            FrameRejected: If every thread is busy
+        """
+        if self._busy >= self.max_workers:
+            # Counted like the rejections of the admission control behind it.
+            rejected_frames.inc('overloaded')
+            raise FrameRejected('overloaded')
+        self._busy += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._call, fn, args, kwargs)
+        finally:
+            self._busy -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _wants_compact(request: Request) -> bool:
+    accept = parse_accept_header(request.headers.get('accept'), MIMEAccept)
+    return hand_api.wants_compact(request.query_params.get('format'), accept)
+
+
+async def _read_frame(request: Request) -> bytes:
+    # Same formats as hand_api.read_frame.
+    mimetype = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    encoding = hand_api.frame_encoding(mimetype)
+    if encoding == 'json':
+        return hand_api.json_frame(await request.body())
+    if encoding == 'multipart':
+        form = await request.form()
+        upload = form.get('frame')
+        return await upload.read() if upload is not None and not isinstance(upload, str) else b''
+    return await request.body()
+
+
+def _detect_and_serialize(session_id: str, buffer: bytes, compact: bool, **fields):
+    result = hand_api.detect_hands(session_id, buffer)
+    if result is None:
+        return None
+    start = time.perf_counter()
+    body = hand_api.serialize_result(result, compact, **fields)
+    stage_seconds.observe(time.perf_counter() - start, 'serialize')
+    return body
+
+
+def _skipped(reason: str) -> Response:
+    headers = {'Retry-After': '1'} if reason != 'superseded' else None
+    return JSONResponse({"error": "frame skipped", "skipped": True, "reason": reason},
+                        status_code=429, headers=headers)
+
+
+def create_asgi_app(flask_app: Optional[Flask] = None) -> Starlette:
+    """
+    Build the ASGI application used in production.
+
+    The detection endpoints (POST /detect_hand, /ws/detect_hand and
+    /ws/globos) are served natively on the event loop, so idle and slow
+    connections only cost a coroutine; detection and serialization run on
+    a DetectionExecutor sized for admission control. Every other route,
+    pages and static files included, is the regular Flask app behind a
+    WSGI adapter.
+
+    Args:
+        flask_app: Flask app to serve, create_app() by default
+
+    Returns:
+        Starlette application
+    """
+    flask_app = flask_app or create_app()
+    admission = hand_api.admission
+    # Threads can hold a running or waiting frame each; anything beyond
+    # would be rejected by admission control anyway.
+    executor = DetectionExecutor(flask_app, admission.max_concurrent + admission.max_waiting)
+
+    async def detect_hand(request: Request) -> Response:
+        start = time.perf_counter()
+        buffer = await _read_frame(request)
+        stage_seconds.observe(time.perf_counter() - start, 'parse')
+        session_id = request.headers.get('x-session-id') or (request.client.host if request.client
+                                                             else 'anonymous')
+        try:
+            reply = await executor.run(_detect_and_serialize, session_id, buffer, _wants_compact(request))
+        except FrameRejected as e:
+            return _skipped(e.reason)
+        if reply is None:
+            return JSONResponse({"error": "no decodable frame in request"}, status_code=400)
+        stage_seconds.observe(time.perf_counter() - start, 'total')
+        body, mimetype = reply
+        return Response(body, media_type=mimetype)
+
+    async def hand_stream(websocket: WebSocket):
+        # Same protocol as hand_stream.hand_stream.
+        await websocket.accept()
+        session_id = websocket.query_params.get('session') or 'ws:%x' % id(websocket)
+        compact = websocket.query_params.get('format') == 'compact'
+        seq = 0
+        try:
+            while True:
+                message = await websocket.receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                seq += 1
+                if message.get('bytes') is None:
+                    await websocket.send_json({"seq": seq, "error": "expected a binary frame"})
+                    continue
+                start = time.perf_counter()
+                try:
+                    reply = await executor.run(_detect_and_serialize, session_id, message['bytes'],
+                                               compact, seq=seq)
+                except FrameRejected as e:
+                    await websocket.send_json({"seq": seq, "skipped": True, "reason": e.reason})
+                    continue
+                if reply is None:
+                    await websocket.send_json({"seq": seq, "error": "undecodable frame"})
+                    continue
+                stage_seconds.observe(time.perf_counter() - start, 'total')
+                body, _ = reply
+                if compact:
+                    await websocket.send_bytes(body)
+                else:
+                    await websocket.send_text(body.decode())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            with flask_app.app_context():
+                hand_api.discard_session(session_id)
+
+    async def game_stream(websocket: WebSocket):
+        # Same protocol as balloons.game_stream.
+        await websocket.accept()
+        session_id = websocket.query_params.get('session') or (
+            websocket.client.host if websocket.client else 'anonymous')
+        with flask_app.app_context():
+            session, description = balloons.start_game(session_id)
+        server = balloons.game_server
+        loop = asyncio.get_running_loop()
+        ready = asyncio.Event()
+
+        def wake():
+            # Runs on the game loop thread.
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                pass  # this loop is closed, the server is shutting down
+
+        subscriber = server.subscribe(session, wake)
+        try:
+            await websocket.send_text(description)
+            ended = False
+            while not ended:
+                await ready.wait()
+                # Cleared before draining, so a message queued meanwhile
+                # wakes the next wait.
+                ready.clear()
+                while True:
+                    try:
+                        message = subscriber.messages.get_nowait()
+                    except queue.Empty:
+                        break
+                    if message is None:
+                        ended = True
+                        break
+                    await websocket.send_bytes(message)
+            await websocket.close()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            server.unsubscribe(session, subscriber)
+            server.stop(session)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        executor.shutdown()
+
+    routes = [
+        Route('/detect_hand', detect_hand, methods=['POST']),
+        WebSocketRoute('/ws/detect_hand', hand_stream),
+        WebSocketRoute('/ws/globos', game_stream),
+        Mount('/', WSGIMiddleware(flask_app)),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
@@ -1,9 +1,72 @@
-from flask import Blueprint, render_template
+import json
+import queue
+
+from flask import Blueprint, current_app, render_template, request
+
+from app.routes.sockets import sock
+from app.services.game_server import GameServer
 
 game = Blueprint('balloons', __name__)
 
+# All server-side games tick on one background event loop.
+game_server = GameServer(tick_rate=30.0)
+
 
 @game.route('/globos')
 def index():
     return render_template('games.html')
 
+
+def start_game(session_id: str):
+    """
+    Start a game for a session with the GAME_BALLOONS and GAME_DURATION
+    settings of the current app.
+
+    Returns:
+        Tuple of the GameSession and its JSON description for the client
+    """
+    config = current_app.config
+    session = game_server.start(
+        session_id,
+        n_balloons=int(config.get('GAME_BALLOONS', 5)),
+        duration=float(config.get('GAME_DURATION', 60.0))
+    )
+    description = json.dumps({
+        "area": session.area,
+        "balloon_size": session.field.size[0].tolist(),
+        "balloons": session.field.count,
+        "sprites": session.n_sprites,
+        "duration": session.duration,
+        "tick_rate": game_server.tick_rate
+    })
+    return session, description
+
+
+@sock.route('/ws/globos', bp=game)
+def game_stream(ws):
+    """
+    Run a server-authoritative balloon game for the connected session.
+
+    The first message is a JSON description of the game; after that the
+    client receives binary state snapshots and deltas (see
+    GameSession.encode) at the tick rate. Hands come from the session's
+    frames on /detect_hand or /ws/detect_hand. Closing the socket ends the
+    game.
+    """
+    session_id = request.args.get('session') or request.remote_addr or 'anonymous'
+    session, description = start_game(session_id)
+    ws.send(description)
+
+    subscriber = game_server.subscribe(session)
+    try:
+        while ws.connected:
+            try:
+                message = subscriber.messages.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            if message is None:
+                break
+            ws.send(message)
+    finally:
+        game_server.unsubscribe(session, subscriber)
+        game_server.stop(session)
@@ -1,18 +1,581 @@
-from flask import Blueprint, Response, Request, jsonify, request
-import cv2, base64
-import numpy as np
-from app.services.hand_detection import HandDetector
+import atexit
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from flask import Blueprint, Response, Request, current_app, jsonify, request
+from werkzeug.datastructures import MIMEAccept
+import base64
+import binascii
+from app.routes.balloons import game_server
+from app.services.admission import AdmissionController, FrameRejected
+from app.services.detector_pool import DetectorPool, tracker_factory
+from app.services.lazy import LazyModules
+from app.services.metrics import (detect_errors, frame_bytes, hands_detected, record_stages,
+                                  rejected_frames, stage_seconds)
+from app.services.preview import MJPEG_MIMETYPE, PreviewHub, PreviewUnavailable
+
+# OpenCV, MediaPipe and NumPy are imported on first use, not with the app,
+# so pages that do no detection start fast. Modules pulling them in are
+# reached through lazy.
+lazy = LazyModules(
+    gestures='app.services.gestures',
+    hand_tracking='app.services.hand_tracking',
+    inference_workers='app.services.inference_workers',
+    landmark_codec='app.services.landmark_codec',
+    landmark_log='app.services.landmark_log',
+    motion_gate='app.services.motion_gate',
+)
+if TYPE_CHECKING:
+    from app.services.hand_detection import HandResult
+    from app.services.landmark_log import SessionRecorders
 
 api = Blueprint('api', __name__)
 
+# One warm tracker per browser session instead of a new graph per frame.
+detector_pool = DetectorPool(max_size=32, idle_timeout=60.0, factory=tracker_factory)
+
+# Latest frame wins per session, bounded concurrency and waiting overall.
+admission = AdmissionController()
+
+# Multiprocess backend, started on first use when HAND_INFERENCE_WORKERS > 0.
+_inference_service = None
+_inference_lock = threading.Lock()
+
+# Thread pools of the batch endpoint, created on its first request: one runs
+# the streams of a batch side by side, the other decodes their frames.
+_batch_pools: Optional[Tuple[ThreadPoolExecutor, ThreadPoolExecutor]] = None
+
+# Annotated MJPEG previews for operators, when HAND_PREVIEW is set.
+preview = PreviewHub()
+preview_enabled = False
+
+# Landmark logs per session, when HAND_RECORD_DIR is set.
+recorders: Optional['SessionRecorders'] = None
+
+
+@api.record_once
+def configure_tracking(state):
+    """
+    Build per-session trackers from the app config:
+    HAND_INFER_EVERY runs inference on one frame out of N, and
+    HAND_LATENCY_BUDGET (seconds) caps average inference time per frame.
+    Landmarks on skipped frames are extrapolated. HAND_MOTION_THRESHOLD
+    (gray levels of the most changed region, null to disable) reuses the
+    last result while the scene does not change, for at most HAND_MOTION_MAX_AGE seconds.
+    HAND_ROI_MARGIN enables inference on a crop around the last known hands.
+    HAND_DECODE_SCALE (1, 2, 4 or 8) downscales uploaded JPEGs while decoding;
+    results then report the decoded size, so it defaults to 1.
+    HAND_LATENCY_TARGET (seconds) adapts model complexity, decode scale and
+    maximum hand count per session to keep decode plus inference under it.
+    HAND_WARMUP builds that many detectors (1 by default, 0 for none) in
+    the background at startup, ready for the first sessions.
+    HAND_MAX_CONCURRENT and HAND_MAX_WAITING bound the frames processed and
+    waiting at once, and HAND_ADMISSION_TIMEOUT (seconds) how long one may
+    wait; frames beyond those limits are rejected with 429.
+    HAND_BATCH_MAX_FRAMES caps the frames of one batch request,
+    HAND_BATCH_FPS is the frame rate assumed for streams sent without
+    capture times and HAND_BATCH_DECODE_AHEAD how many frames of a stream
+    are decoded ahead of its tracker.
+    HAND_RECORD_DIR appends every session's results to a landmark log
+    <session>.hlog in that directory, for replay without a camera. A log
+    is closed with its session's detector, after HAND_RECORD_IDLE_TIMEOUT
+    seconds without frames, or when more than HAND_RECORD_MAX_OPEN are
+    open, and appended to if the session comes back.
+    HAND_PREVIEW enables annotated MJPEG previews of sessions, rendered
+    only while watched, with HAND_PREVIEW_QUALITY (JPEG), HAND_PREVIEW_FPS,
+    HAND_PREVIEW_SCALE (decode downscale) and HAND_PREVIEW_MAX_VIEWERS.
+    """
+    global recorders, preview_enabled
+    config = state.app.config
+    admission.max_concurrent = int(config.get('HAND_MAX_CONCURRENT', admission.max_concurrent))
+    admission.max_waiting = int(config.get('HAND_MAX_WAITING', admission.max_concurrent))
+    admission.wait_timeout = float(config.get('HAND_ADMISSION_TIMEOUT', admission.wait_timeout))
+    detector_pool.factory = partial(
+        tracker_factory,
+        infer_every=int(config.get('HAND_INFER_EVERY', 1)),
+        latency_budget=config.get('HAND_LATENCY_BUDGET'),
+        motion_threshold=config.get('HAND_MOTION_THRESHOLD', 10.0),
+        motion_max_age=float(config.get('HAND_MOTION_MAX_AGE', 5.0)),
+        roi_margin=config.get('HAND_ROI_MARGIN'),
+        decode_scale=int(config.get('HAND_DECODE_SCALE', 1)),
+        latency_target=config.get('HAND_LATENCY_TARGET')
+    )
+
+    preview_enabled = bool(config.get('HAND_PREVIEW', False))
+    preview.quality = int(config.get('HAND_PREVIEW_QUALITY', preview.quality))
+    preview.max_fps = float(config.get('HAND_PREVIEW_FPS', preview.max_fps))
+    preview.decode_scale = int(config.get('HAND_PREVIEW_SCALE', preview.decode_scale))
+    preview.max_viewers = int(config.get('HAND_PREVIEW_MAX_VIEWERS', preview.max_viewers))
+
+    record_dir = config.get('HAND_RECORD_DIR')
+    if record_dir:
+        recorders = lazy.landmark_log.SessionRecorders(
+            record_dir,
+            max_open=int(config.get('HAND_RECORD_MAX_OPEN', 64)),
+            idle_timeout=float(config.get('HAND_RECORD_IDLE_TIMEOUT', detector_pool.idle_timeout))
+        )
+        # Logs close with their session's detector, or on their own when idle.
+        detector_pool.on_evict = recorders.close
+        atexit.register(recorders.close_all)
+
+    warmup = int(config.get('HAND_WARMUP', 1))
+    if warmup:
+        app = state.app
+
+        def warm_detectors():
+            with app.app_context():
+                # With workers, each one warms its own pool as it starts.
+                if inference_service() is None:
+                    detector_pool.warmup(warmup)
+
+        threading.Thread(target=warm_detectors, name='detector-warmup', daemon=True).start()
+
+
+def inference_service():
+    """
+    Return the multiprocess inference service, or None when detection runs
+    in-process (the default).
+    """
+    global _inference_service
+    workers = current_app.config.get('HAND_INFERENCE_WORKERS', 0)
+    if not workers:
+        return None
+    if _inference_service is None:
+        with _inference_lock:
+            if _inference_service is None:
+                _inference_service = lazy.inference_workers.InferenceService(
+                    num_workers=int(workers),
+                    factory=detector_pool.factory,
+                    max_size=detector_pool.max_size,
+                    idle_timeout=detector_pool.idle_timeout,
+                    warmup=int(current_app.config.get('HAND_WARMUP', 1))
+                )
+    return _inference_service
+
+
+def detect_hands(session_id: str, buffer) -> Optional['HandResult']:
+    """
+    Decode an encoded frame and run hand detection for a session on the
+    configured backend.
+
+    Frames first go through admission control. Frame size, admission and
+    queue wait, per-stage timings, hand count and errors are recorded in
+    the process metrics. Waiting for the session's detector includes
+    building it on a session's first frame.
+
+    Returns:
+        HandResult, or None if the frame cannot be decoded
+
+    Raises:
+        FrameRejected: If admission control dropped the frame
+    """
+    frame_bytes.observe(len(buffer))
+    service = inference_service()
+    start = time.perf_counter()
+    try:
+        with admission.admit(session_id):
+            stage_seconds.observe(time.perf_counter() - start, 'admission')
+            if service is not None:
+                result = service.find_hands_encoded(session_id, buffer)
+            else:
+                start = time.perf_counter()
+                with detector_pool.acquire(session_id) as detector:
+                    stage_seconds.observe(time.perf_counter() - start, 'queue_wait')
+                    result = detector.find_hands_encoded(buffer)
+                    record_stages(getattr(detector, 'timings', {}))
+    except FrameRejected as e:
+        rejected_frames.inc(e.reason)
+        raise
+    except TimeoutError:
+        detect_errors.inc('timeout')
+        raise
+    except Exception:
+        detect_errors.inc('exception')
+        raise
+
+    if result is None:
+        detect_errors.inc('undecodable')
+        return None
+    hands_detected.observe(len(result.landmarks))
+    if recorders is not None:
+        recorders.record(session_id, result)
+    preview.publish(session_id, buffer, result)
+    # Hands drive the session's server-side game, if one is running.
+    game_server.feed(session_id, result)
+    return result
+
+
+def batch_pools() -> Tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+    """
+    Return the (streams, decode) thread pools of the batch endpoint.
+    """
+    global _batch_pools
+    if _batch_pools is None:
+        with _inference_lock:
+            if _batch_pools is None:
+                _batch_pools = (
+                    ThreadPoolExecutor(admission.max_concurrent, thread_name_prefix='batch-stream'),
+                    ThreadPoolExecutor(os.cpu_count() or 1, thread_name_prefix='batch-decode'),
+                )
+    return _batch_pools
+
+
+def detect_stream(stream_id: str, buffers: List[bytes],
+                  timestamps: List[float]) -> Tuple[List[Optional['HandResult']], str]:
+    """
+    Run hand detection over consecutive frames of one stream.
+
+    The stream ID is the session key, so its warm detector is reused across
+    batches, and the frames take one admission slot for the whole group.
+    In-process, frames are decoded in parallel on the decode pool, a few
+    ahead of the stream's tracker working through them in order.
+
+    Args:
+        stream_id: Key identifying the stream, like a session ID
+        buffers: Encoded frames of the stream, oldest first
+        timestamps: Time of each frame on the time.monotonic() clock, see
+            hand_tracking.frame_times()
+
+    Returns:
+        Tuple of (HandResult or None per frame, rejection reason); results
+        are all None and the reason is set if admission control dropped
+        the stream, otherwise the reason is empty
+    """
+    for buffer in buffers:
+        frame_bytes.observe(len(buffer))
+    service = inference_service()
+    try:
+        with admission.admit(stream_id):
+            if service is not None:
+                results = [service.find_hands_encoded(stream_id, buffer, timestamp)
+                           for buffer, timestamp in zip(buffers, timestamps)]
+            else:
+                _, decode_pool = batch_pools()
+                max_in_flight = int(current_app.config.get('HAND_BATCH_DECODE_AHEAD', 4))
+                results = []
+                with detector_pool.acquire(stream_id) as detector:
+                    for result in detector.track_encoded(buffers, decode_pool, timestamps,
+                                                         max_in_flight=max_in_flight):
+                        record_stages(detector.timings)
+                        results.append(result)
+    except FrameRejected as e:
+        rejected_frames.inc(e.reason, amount=len(buffers))
+        return [None] * len(buffers), e.reason
+    except TimeoutError:
+        detect_errors.inc('timeout')
+        raise
+    except Exception:
+        detect_errors.inc('exception')
+        raise
+
+    for buffer, result in zip(buffers, results):
+        if result is None:
+            detect_errors.inc('undecodable')
+        else:
+            hands_detected.observe(len(result.landmarks))
+            if recorders is not None:
+                recorders.record(stream_id, result)
+            preview.publish(stream_id, buffer, result)
+    return results, ''
+
+
+def discard_session(session_id: str):
+    """
+    Release the detector and landmark log of a session that has gone away.
+    """
+    if recorders is not None:
+        recorders.close(session_id)
+    service = inference_service()
+    if service is not None:
+        service.discard(session_id)
+    else:
+        detector_pool.discard(session_id)
+
+
+def session_key(req: Request) -> str:
+    """
+    Identify the client session a frame belongs to.
+
+    Clients send a random ``X-Session-ID`` per page load; requests without
+    one fall back to the remote address.
+    """
+    return req.headers.get('X-Session-ID') or req.remote_addr or 'anonymous'
+
+
+def frame_encoding(mimetype: str) -> str:
+    """
+    Tell how a detection request carries its frame, from its mimetype.
+
+    Shared by the Flask and ASGI servers, so both accept the same bodies.
+
+    Args:
+        mimetype: Content-Type without parameters, lowercase
+
+    Returns:
+        'json' for the legacy base64 JSON body, 'multipart' for a form with
+        a ``frame`` file field, 'raw' for the encoded image as the body
+    """
+    if mimetype == 'application/json' or (mimetype.startswith('application/')
+                                           and mimetype.endswith('+json')):
+        return 'json'
+    if mimetype == 'multipart/form-data':
+        return 'multipart'
+    return 'raw'
+
+
+def json_frame(body: bytes) -> bytes:
+    """
+    Decode the base64 data URL of a legacy JSON body ``{"frame": ...}``.
+
+    Returns:
+        Encoded image bytes, empty if the body is not such an object or the
+        frame is not valid base64
+    """
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return b''
+    if not isinstance(data, dict) or not isinstance(data.get('frame'), str):
+        return b''
+    try:
+        return base64.b64decode(data['frame'].split(',')[-1])
+    except binascii.Error:
+        return b''
+
+
+def read_frame(req: Request):
+    """
+    Extract the encoded frame carried by a detection request.
+
+    Accepts the legacy JSON body with a base64 data URL as well as binary
+    uploads: a raw ``image/jpeg``, ``image/webp``, ``image/png`` or
+    ``application/octet-stream`` body, or a multipart form with a ``frame``
+    file field. Binary bodies are passed on as-is, without base64 or
+    intermediate copies; decoding happens in the session's tracker.
+
+    Returns:
+        Encoded image bytes, empty if the request carries no frame
+    """
+    encoding = frame_encoding(req.mimetype)
+    if encoding == 'json':
+        return json_frame(req.get_data(cache=False))
+    if encoding == 'multipart':
+        upload = req.files.get('frame')
+        return upload.read() if upload is not None else b''
+    return req.get_data(cache=False)
+
+
+def result_to_json(result: 'HandResult') -> dict:
+    """
+    Build the JSON body for a detection result: landmarks plus gestures.
+    """
+    gestures = lazy.gestures.compute_gestures(result.landmarks, result.image_shape)
+    return {
+        "coordinates": result.landmarks.tolist(),
+        "hand_types": result.hand_types,
+        "gestures": lazy.gestures.gestures_to_json(gestures)
+    }
+
+
+def serialize_result(result: 'HandResult', compact: bool, **fields) -> Tuple[bytes, str]:
+    """
+    Encode a detection result for the response body.
+
+    Args:
+        result: Detection result
+        compact: Use the compact binary encoding instead of JSON
+        **fields: Extra fields put first in JSON bodies, e.g. seq
+
+    Returns:
+        Tuple of (body, mimetype)
+    """
+    if compact:
+        return lazy.landmark_codec.encode_compact(result), lazy.landmark_codec.COMPACT_MIMETYPE
+    return json.dumps({**fields, **result_to_json(result)}).encode(), 'application/json'
+
+
+def wants_compact(format: Optional[str], accept: MIMEAccept) -> bool:
+    """
+    Whether the client asked for the compact binary landmark encoding,
+    via ``?format=compact`` or ``Accept: application/x-hand-landmarks``.
+
+    Args:
+        format: The ``format`` query argument, if any
+        accept: Parsed Accept header of the request
+    """
+    if format == 'compact':
+        return True
+    compact = lazy.landmark_codec.COMPACT_MIMETYPE
+    return accept.best_match(['application/json', compact]) == compact
+
+
 @api.route('/detect_hand', methods=['POST'])
 def hand_stimation():
-    data = request.get_json()
-    frame_str = data['frame'].split(',')[1]
-    decoded_img = base64.b64decode(frame_str)
-    np_arr = np.frombuffer(decoded_img, np.uint8)
-    img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
-
-    detector = HandDetector()
-    results = detector.find_hands(img)
-    return jsonify({"coordinates": results["coordinates"]})
+    start = time.perf_counter()
+    buffer = read_frame(request)
+    stage_seconds.observe(time.perf_counter() - start, 'parse')
+    try:
+        result = detect_hands(session_key(request), buffer)
+    except FrameRejected as e:
+        # Fast rejection: the client sends its next, newer frame instead.
+        response = jsonify({"error": "frame skipped", "skipped": True, "reason": e.reason})
+        response.status_code = 429
+        if e.reason != 'superseded':
+            response.headers['Retry-After'] = '1'
+        return response
+    if result is None:
+        return jsonify({"error": "no decodable frame in request"}), 400
+
+    serialize_start = time.perf_counter()
+    compact = wants_compact(request.args.get('format'), request.accept_mimetypes)
+    body, mimetype = serialize_result(result, compact)
+    response = Response(body, mimetype=mimetype)
+    end = time.perf_counter()
+    stage_seconds.observe(end - serialize_start, 'serialize')
+    stage_seconds.observe(end - start, 'total')
+    return response
+
+
+@api.route('/detect_hand/batch', methods=['POST'])
+def hand_batch():
+    """
+    Detect hands in many frames, from one or several streams, at once.
+
+    The request is a multipart form whose file fields are the frames, each
+    named after the stream it belongs to, in order within a stream. A text
+    field of the same name may give the capture times of the stream's
+    frames, in seconds and comma separated, so smoothing and extrapolation
+    see their real spacing; otherwise they are taken as ``?fps=`` frames per
+    second apart, HAND_BATCH_FPS by default. Frames are decoded in
+    parallel, each stream runs through its own warm detector and the
+    streams run side by side. The response packs every result in
+    the batch format of landmark_codec.encode_batch(), one frame record per
+    uploaded frame in request order; ``?format=json`` returns the same as a
+    JSON list instead.
+    """
+    codec = lazy.landmark_codec
+    start = time.perf_counter()
+    frames = [(stream_id, upload.read()) for stream_id, upload in request.files.items(multi=True)]
+    stage_seconds.observe(time.perf_counter() - start, 'parse')
+    if not frames:
+        return jsonify({"error": "no frames in request"}), 400
+    max_frames = int(current_app.config.get('HAND_BATCH_MAX_FRAMES', 256))
+    if len(frames) > max_frames:
+        return jsonify({"error": f"at most {max_frames} frames per batch"}), 413
+
+    streams: Dict[str, List[int]] = {}
+    for index, (stream_id, _) in enumerate(frames):
+        streams.setdefault(stream_id, []).append(index)
+
+    # The last frame of every stream is taken as captured now.
+    now = time.monotonic()
+    times: Dict[str, List[float]] = {}
+    try:
+        fps = float(request.args.get('fps', current_app.config.get('HAND_BATCH_FPS', 30.0)))
+        for stream_id, indices in streams.items():
+            field = request.form.get(stream_id)
+            timestamps = [float(t) for t in field.split(',')] if field is not None else None
+            times[stream_id] = lazy.hand_tracking.frame_times(len(indices), timestamps, fps, now)
+    except ValueError as e:
+        return jsonify({"error": f"invalid frame timing: {e}"}), 400
+
+    def run(stream_id: str, indices: List[int]):
+        with app.app_context():
+            return detect_stream(stream_id, [frames[i][1] for i in indices], times[stream_id])
+
+    app = current_app._get_current_object()
+    stream_pool, _ = batch_pools()
+    results: List[Optional['HandResult']] = [None] * len(frames)
+    statuses = [codec.FRAME_OK] * len(frames)
+    pending = [(indices, stream_pool.submit(run, stream_id, indices))
+               for stream_id, indices in streams.items()]
+    for indices, future in pending:
+        stream_results, rejected = future.result()
+        for index, result in zip(indices, stream_results):
+            results[index] = result
+            if rejected:
+                statuses[index] = codec.FRAME_SKIPPED
+            elif result is None:
+                statuses[index] = codec.FRAME_UNDECODABLE
+
+    serialize_start = time.perf_counter()
+    if request.args.get('format') == 'json':
+        body = json.dumps({"frames": [
+            {"stream": stream_id, "status": status,
+             **(result_to_json(result) if result is not None else {})}
+            for (stream_id, _), result, status in zip(frames, results, statuses)
+        ]}).encode()
+        response = Response(body, mimetype='application/json')
+    else:
+        response = Response(codec.encode_batch(results, statuses), mimetype=codec.BATCH_MIMETYPE)
+    end = time.perf_counter()
+    stage_seconds.observe(end - serialize_start, 'serialize')
+    stage_seconds.observe(end - start, 'batch_total')
+    return response
+
+
+@api.route('/detect_hand/preview/<session_id>', methods=['GET'])
+def hand_preview(session_id):
+    """
+    Stream a session's frames with its hands drawn, as multipart MJPEG,
+    e.g. as the src of an <img>. Disabled unless HAND_PREVIEW is set.
+    """
+    if not preview_enabled:
+        return jsonify({"error": "preview disabled"}), 404
+    try:
+        parts = preview.stream(session_id)
+    except PreviewUnavailable as e:
+        return jsonify({"error": str(e)}), 503
+    response = Response(parts, mimetype=MJPEG_MIMETYPE)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+@api.route('/detect_hand/stats', methods=['GET'])
+def hand_stats():
+    service = inference_service()
+    if service is None:
+        pools = [detector_pool.stats()]
+        trackers = [tracker.stats() for tracker in detector_pool.detectors()]
+        gates = [lazy.motion_gate.motion_stats.as_dict()]
+    else:
+        # Sessions are tracked in the worker processes, ask each of them.
+        workers = service.stats()
+        pools = [worker['pool'] for worker in workers]
+        trackers = [tracker for worker in workers for tracker in worker['trackers']]
+        gates = [worker['motion_gate'] for worker in workers]
+    motion_gate = sum_stats(gates)
+    motion_gate['hit_rate'] = motion_gate['hits'] / motion_gate['checks'] if motion_gate.get('checks') else 0.0
+    return jsonify({
+        "pool": sum_stats(pools),
+        "tracking": {
+            "frames": sum(t['frames'] for t in trackers),
+            "inferences": sum(t['inferences'] for t in trackers),
+            "static_frames": sum(t['static_frames'] for t in trackers),
+            "roi_inferences": sum(t['roi_inferences'] for t in trackers),
+            # Sessions per quality level, 0 being the configured quality
+            "quality_levels": dict(Counter(t['quality_level'] for t in trackers))
+        },
+        "motion_gate": motion_gate,
+        "admission": admission.stats(),
+        "preview": preview.stats(),
+        "workers": service.num_workers if service is not None else 0,
+        "worker_restarts": service.restarts if service is not None else 0
+    })
+
+
+def sum_stats(stats: List[dict]) -> dict:
+    """
+    Add up counters reported by several pools or processes, key by key.
+    """
+    total = {}
+    for counters in stats:
+        for key, value in counters.items():
+            total[key] = total.get(key, 0) + value
+    return total
@@ -0,0 +1,56 @@
+import json
+import time
+
+from flask import request
+
+from app.routes.hand_api import api, detect_hands, discard_session, serialize_result
+from app.routes.sockets import sock
+from app.services.admission import FrameRejected
+from app.services.metrics import stage_seconds
+
+
+@sock.route('/ws/detect_hand', bp=api)
+def hand_stream(ws):
+    """
+    Stream hand landmarks over a single WebSocket connection.
+
+    The client pushes one encoded frame (JPEG/WebP/PNG) per binary message
+    and receives one JSON text message per frame, in order. All frames of a
+    connection go through the same warm, tracking-mode detector of the
+    session, so the client can send the next frame as soon as the
+    previous result arrives instead of polling every 500 ms.
+
+    With ``?format=compact`` results are sent as binary messages in the
+    compact landmark encoding instead of JSON.
+    """
+    session_id = request.args.get('session') or 'ws:%x' % id(ws)
+    compact = request.args.get('format') == 'compact'
+    seq = 0
+    try:
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            seq += 1
+            if isinstance(message, str):
+                ws.send(json.dumps({"seq": seq, "error": "expected a binary frame"}))
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = detect_hands(session_id, message)
+            except FrameRejected as e:
+                ws.send(json.dumps({"seq": seq, "skipped": True, "reason": e.reason}))
+                continue
+            if result is None:
+                ws.send(json.dumps({"seq": seq, "error": "undecodable frame"}))
+                continue
+
+            serialize_start = time.perf_counter()
+            reply, _ = serialize_result(result, compact, seq=seq)
+            end = time.perf_counter()
+            stage_seconds.observe(end - serialize_start, 'serialize')
+            stage_seconds.observe(end - start, 'total')
+            ws.send(reply if compact else reply.decode())
+    finally:
+        discard_session(session_id)
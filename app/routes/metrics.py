@@ -0,0 +1,13 @@
+from flask import Blueprint, Response
+
+from app.services.metrics import registry
+
+metrics = Blueprint('metrics', __name__)
+
+
+@metrics.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Expose the process metrics in the Prometheus text format.
+    """
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,4 @@
+from flask_sock import Sock
+
+# Shared WebSocket extension, routes register on their own blueprints.
+sock = Sock()
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+
+class FrameRejected(Exception):
+    """A frame was dropped by admission control instead of being processed."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        # 'superseded', 'overloaded', 'timeout' or 'worker_restart'
+        self.reason = reason
+
+
+class _Ticket:
+    """A frame waiting for its turn."""
+
+    __slots__ = ('superseded',)
+
+    def __init__(self):
+        self.superseded = False
+
+
+class _SessionState:
+    __slots__ = ('busy', 'waiting')
+
+    def __init__(self):
+        self.busy = False
+        self.waiting: Optional[_Ticket] = None
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent: Optional[int] = None, max_waiting: Optional[int] = None,
+                 wait_timeout: float = 1.0):
+        """
+        Decide which frames get processed when they arrive faster than
+        detection keeps up.
+
+        Each session processes one frame at a time and keeps at most one
+        more waiting; a newer frame supersedes the waiting one, which is
+        rejected at once, so a session always gets its latest frame next
+        rather than working through a backlog of stale ones. Across
+        sessions, at most max_concurrent frames are processed at once and
+        at most max_waiting wait; beyond that frames are rejected right
+        away, keeping latency bounded instead of letting queues grow.
+
+        Args:
+            max_concurrent: Frames processed at once, defaults to the CPU count
+            max_waiting: Frames waiting at once across all sessions,
+                defaults to max_concurrent
+            wait_timeout: Seconds a frame may wait before being rejected
+        """
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self.max_waiting = max_waiting if max_waiting is not None else self.max_concurrent
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition()
+        self._sessions: Dict[str, _SessionState] = {}
+        self.active = 0
+        self.waiting = 0
+
+    def _can_start(self, state: _SessionState) -> bool:
+        return not state.busy and self.active < self.max_concurrent
+
+    @contextmanager
+    def admit(self, session_id: str) -> Iterator[None]:
+        """
+        Hold a processing slot for one frame of a session.
+
+        Blocks while the session's previous frame or too many frames
+        overall are being processed.
+
+        Args:
+            session_id: Key identifying the client session
+
+        Raises:
+            FrameRejected: If a newer frame of the session arrived while
+                this one waited, too many frames are waiting, or the wait
+                timed out
+        """
+        with self._cond:
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self._sessions[session_id] = _SessionState()
+            if self._can_start(state) and state.waiting is None:
+                state.busy = True
+                self.active += 1
+            else:
+                self._wait(session_id, state)
+        try:
+            yield
+        finally:
+            with self._cond:
+                state.busy = False
+                self.active -= 1
+                if state.waiting is None:
+                    del self._sessions[session_id]
+                self._cond.notify_all()
+
+    def _wait(self, session_id: str, state: _SessionState):
+        # Called with the condition held.
+        if state.waiting is not None:
+            # Latest frame wins: the older waiting frame gives up its place.
+            state.waiting.superseded = True
+            self._cond.notify_all()
+        elif self.waiting >= self.max_waiting:
+            if not state.busy:
+                del self._sessions[session_id]
+            raise FrameRejected('overloaded')
+        else:
+            self.waiting += 1
+        ticket = state.waiting = _Ticket()
+
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            if ticket.superseded:
+                raise FrameRejected('superseded')
+            if self._can_start(state):
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                state.waiting = None
+                self.waiting -= 1
+                if not state.busy:
+                    del self._sessions[session_id]
+                raise FrameRejected('timeout')
+            self._cond.wait(remaining)
+
+        state.waiting = None
+        self.waiting -= 1
+        state.busy = True
+        self.active += 1
+
+    def stats(self):
+        """
+        Return the frames being processed and waiting right now.
+        """
+        with self._cond:
+            return {
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_waiting': self.max_waiting,
+            }
@@ -0,0 +1,125 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Unit vectors balloons can start moving along: axes and diagonals.
+DIRECTIONS = np.array([(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1)],
+                      dtype=np.float32)
+DIRECTIONS /= np.linalg.norm(DIRECTIONS, axis=1, keepdims=True)
+
+
+class BalloonField:
+    def __init__(self, count: int, bounds: Tuple[int, int], size: Tuple[int, int] = (100, 100),
+                 n_sprites: int = 5, speed: float = 180.0,
+                 change_interval: Tuple[float, float] = (0.3, 1.5),
+                 reappear_delay: float = 1.0, now: float = 0.0, seed: Optional[int] = None):
+        """
+        Struct-of-arrays simulation of bouncing balloons.
+
+        Every property is one NumPy array indexed by balloon, so movement,
+        bouncing, sprite changes, respawns and hand collisions are each a
+        single vectorized step whatever the balloon count.
+
+        Args:
+            count: Number of balloons
+            bounds: (width, height) of the play area in pixels
+            size: (width, height) of each balloon in pixels
+            n_sprites: Number of sprites balloons cycle through
+            speed: Movement speed in pixels per second
+            change_interval: (min, max) seconds between sprite changes
+            reappear_delay: Seconds a caught balloon stays hidden
+            now: Start time in seconds
+            seed: Random seed, for reproducible games
+        """
+        self.count = count
+        self.bounds = np.array(bounds, dtype=np.float32)
+        self.n_sprites = n_sprites
+        self.speed = speed
+        self.change_interval = change_interval
+        self.reappear_delay = reappear_delay
+        self.rng = np.random.default_rng(seed)
+
+        self.size = np.tile(np.array(size, dtype=np.float32), (count, 1))
+        self.position = self._random_positions(count)
+        directions = DIRECTIONS[self.rng.integers(0, len(DIRECTIONS), count)]
+        self.velocity = directions * np.float32(speed)
+        self.visible = np.ones(count, dtype=bool)
+        self.hidden_until = np.zeros(count, dtype=np.float64)
+        self.sprite = self.rng.integers(0, n_sprites, count)
+        self.next_change = now + self._random_intervals(count)
+
+    def _random_positions(self, n: int) -> np.ndarray:
+        limit = np.maximum(self.bounds - self.size[:n], 0)
+        return (self.rng.random((n, 2)) * limit).astype(np.float32)
+
+    def _random_intervals(self, n: int) -> np.ndarray:
+        return self.rng.uniform(*self.change_interval, n)
+
+    @property
+    def max_position(self) -> np.ndarray:
+        """(count, 2) largest top-left position keeping each balloon inside."""
+        return np.maximum(self.bounds - self.size, 0)
+
+    def step(self, dt: float, now: float):
+        """
+        Advance the simulation by dt seconds.
+
+        Visible balloons move and bounce off the edges, cycle their sprite
+        when their interval elapses, and hidden balloons whose delay is over
+        reappear at a random position.
+
+        Args:
+            dt: Elapsed time in seconds
+            now: Current time in seconds
+        """
+        visible = self.visible
+        self.position += self.velocity * (np.float32(dt) * visible[:, None])
+
+        high = self.max_position
+        # Point the velocity back inside rather than flipping it, so a
+        # balloon pushed past an edge cannot get stuck oscillating there.
+        self.velocity = np.where(self.position <= 0, np.abs(self.velocity), self.velocity)
+        self.velocity = np.where(self.position >= high, -np.abs(self.velocity), self.velocity)
+        np.clip(self.position, 0, high, out=self.position)
+
+        changing = visible & (now >= self.next_change)
+        if changing.any():
+            self.sprite[changing] = (self.sprite[changing] + 1) % self.n_sprites
+            self.next_change[changing] = now + self._random_intervals(int(changing.sum()))
+
+        respawning = ~visible & (now >= self.hidden_until)
+        if respawning.any():
+            indices = np.flatnonzero(respawning)
+            limit = self.max_position[indices]
+            self.position[indices] = self.rng.random((len(indices), 2)) * limit
+            self.visible[indices] = True
+
+    def collide(self, hands: np.ndarray, closed: np.ndarray, now: float) -> np.ndarray:
+        """
+        Catch every visible balloon that contains a closed hand.
+
+        All balloon-hand pairs are tested at once; caught balloons are hidden
+        until the reappear delay passes.
+
+        Args:
+            hands: (n_hands, 2) hand positions in pixels
+            closed: (n_hands,) bool, only closed hands catch balloons
+            now: Current time in seconds
+
+        Returns:
+            Indices of the balloons caught this step
+        """
+        hands = np.asarray(hands, dtype=np.float32).reshape(-1, 2)
+        closed = np.asarray(closed, dtype=bool)
+        if not len(hands) or not closed.any():
+            return np.empty(0, dtype=np.intp)
+
+        hands = hands[closed]
+        low = self.position[:, None, :]
+        high = low + self.size[:, None, :]
+        inside = ((hands[None] >= low) & (hands[None] <= high)).all(axis=2)
+        caught = np.flatnonzero(self.visible & inside.any(axis=1))
+
+        self.visible[caught] = False
+        self.hidden_until[caught] = now + self.reappear_delay
+        return caught
@@ -0,0 +1,186 @@
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Union
+
+import cv2
+import numpy as np
+
+
+class CapturedFrame(NamedTuple):
+    image: np.ndarray   # BGR
+    index: int          # frames captured before this one
+    timestamp: float    # time.monotonic() when it was read from the device
+
+    @property
+    def age(self) -> float:
+        """Seconds since the frame was captured."""
+        return time.monotonic() - self.timestamp
+
+
+def parse_source(spec: str) -> Union[int, str]:
+    """
+    Turn a command-line source into a camera index ('0', '1') or a path.
+    """
+    return int(spec) if spec.isdigit() else spec
+
+
+class CaptureSource:
+    def __init__(self, source: Union[int, str], drop: bool = True, realtime: Optional[bool] = None,
+                 loop: bool = False, name: Optional[str] = None):
+        """
+        Read frames from a camera or video file on a background thread.
+
+        Frames go into a single latest-frame slot: a frame nobody read
+        before the next one arrived is dropped, so a slow consumer always
+        gets the newest frame instead of a backlog queued in the driver.
+        Each source has its own thread, so several cameras or files are
+        captured concurrently.
+
+        Args:
+            source: Camera index or video file path
+            drop: Replace unread frames; False makes the reader wait for the
+                consumer instead, so every frame of a file is delivered
+            realtime: Pace reading to the video's FPS, as a camera would.
+                Defaults to True for files; cameras are paced by the device
+            loop: Restart files at the end instead of stopping
+            name: Label used in stats, the source by default
+
+        Raises:
+            IOError: If the source cannot be opened
+        """
+        self.source = source
+        self.name = name or str(source)
+        self.drop = drop
+        self.is_file = isinstance(source, str)
+        self.realtime = self.is_file if realtime is None else realtime
+        self.loop = loop
+        self.capture = cv2.VideoCapture(source)
+        if not self.capture.isOpened():
+            raise IOError(f"cannot open capture source {source!r}")
+        if not self.is_file:
+            # Keep the driver from queueing frames behind our back.
+            self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        fps = self.capture.get(cv2.CAP_PROP_FPS)
+        self.source_fps = fps if fps and fps > 0 else 30.0
+
+        self._cond = threading.Condition()
+        self._latest: Optional[CapturedFrame] = None
+        self._delivered_index = -1
+        self._running = True
+        self._ended = False
+        self.frames = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.capture_fps = 0.0  # moving average
+        self._last_capture_at: Optional[float] = None
+        self._thread = threading.Thread(target=self._run, name=f'capture-{self.name}', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        interval = 1.0 / self.source_fps
+        next_at = time.monotonic()
+        try:
+            while self._running:
+                if self.realtime:
+                    delay = next_at - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    next_at = max(next_at + interval, time.monotonic() - interval)
+                ok, image = self.capture.read()
+                if not ok:
+                    if self.is_file and self.loop and self.frames:
+                        self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                        continue
+                    break
+                self._publish(image)
+        finally:
+            with self._cond:
+                self._ended = True
+                self._cond.notify_all()
+
+    def _publish(self, image: np.ndarray):
+        now = time.monotonic()
+        if self._last_capture_at is not None:
+            elapsed = now - self._last_capture_at
+            if elapsed > 0:
+                fps = 1.0 / elapsed
+                self.capture_fps = fps if not self.capture_fps else 0.9 * self.capture_fps + 0.1 * fps
+        self._last_capture_at = now
+
+        with self._cond:
+            if not self.drop:
+                while (self._running and self._latest is not None
+                       and self._latest.index != self._delivered_index):
+                    self._cond.wait()
+            elif self._latest is not None and self._latest.index != self._delivered_index:
+                self.dropped += 1
+            self._latest = CapturedFrame(image, self.frames, now)
+            self.frames += 1
+            self._cond.notify_all()
+
+    def read(self, timeout: Optional[float] = None) -> Optional[CapturedFrame]:
+        """
+        Return the newest frame not returned before, waiting for one if
+        needed.
+
+        Args:
+            timeout: Seconds to wait, None waits as long as the source runs
+
+        Returns:
+            The frame, or None if the source ended, was stopped or the wait
+            timed out
+        """
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: (self._latest is not None and self._latest.index != self._delivered_index)
+                or self._ended or not self._running,
+                timeout
+            )
+            latest = self._latest
+            if not ready or latest is None or latest.index == self._delivered_index:
+                return None
+            self._delivered_index = latest.index
+            self.delivered += 1
+            self._cond.notify_all()
+            return latest
+
+    def latest(self) -> Optional[CapturedFrame]:
+        """
+        Return the newest frame without waiting, even if it was returned
+        before.
+        """
+        return self._latest
+
+    @property
+    def running(self) -> bool:
+        return self._running and not self._ended
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return capture rate, frame counters and the age of the newest frame.
+        """
+        latest = self._latest
+        return {
+            'source': self.name,
+            'capture_fps': self.capture_fps,
+            'frames': self.frames,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'age': latest.age if latest is not None else None,
+        }
+
+    def close(self):
+        """
+        Stop the reader thread and release the device.
+        """
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
+        self.capture.release()
+
+    def __enter__(self) -> 'CaptureSource':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
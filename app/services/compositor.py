@@ -0,0 +1,120 @@
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class Sprite:
+    def __init__(self, image: np.ndarray):
+        """
+        Overlay image prepared once for fast blending.
+
+        Color is premultiplied by alpha and both terms are kept as uint16,
+        so blending needs no float conversion per frame.
+
+        Args:
+            image: BGRA (or BGR, treated as opaque) uint8 image
+        """
+        if image.ndim != 3 or image.shape[2] not in (3, 4):
+            raise ValueError(f"expected a BGR or BGRA image, got shape {image.shape}")
+        self.image = image
+        height, width = image.shape[:2]
+        self.size = (height, width)
+
+        if image.shape[2] == 3:
+            alpha = np.full((height, width, 1), 255, dtype=np.uint16)
+        else:
+            alpha = image[:, :, 3:4].astype(np.uint16)
+        self.bgr = np.ascontiguousarray(image[:, :, :3])
+        # color * alpha and 255 - alpha; their blend with any background
+        # stays within 255 * 255, so uint16 never overflows.
+        self.premultiplied = self.bgr.astype(np.uint16) * alpha
+        self.inverse_alpha = 255 - alpha
+        self.opaque = bool((alpha == 255).all())
+        self.transparent = bool((alpha == 0).all())
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.image.shape
+
+
+class Compositor:
+    def __init__(self):
+        """
+        Blend sprites onto BGR frames with integer arithmetic.
+
+        Scratch buffers are kept between calls, so compositing a frame
+        allocates nothing once every sprite size has been seen.
+        """
+        self._scratch = {}
+
+    def _buffer(self, shape) -> np.ndarray:
+        buffer = self._scratch.get(shape)
+        if buffer is None:
+            buffer = self._scratch[shape] = np.empty(shape, dtype=np.uint16)
+        return buffer
+
+    def draw(self, frame: np.ndarray, sprite: Sprite, position: Tuple[int, int]) -> np.ndarray:
+        """
+        Blend one sprite onto a BGR frame in place.
+
+        Sprites partially outside the frame are clipped, not moved.
+
+        Args:
+            frame: BGR uint8 frame, modified in place
+            sprite: Prepared sprite
+            position: (x, y) of the sprite's top-left corner in pixels
+
+        Returns:
+            The frame
+        """
+        if sprite.transparent:
+            return frame
+        frame_h, frame_w = frame.shape[:2]
+        sprite_h, sprite_w = sprite.size
+        x, y = int(position[0]), int(position[1])
+
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + sprite_w, frame_w), min(y + sprite_h, frame_h)
+        if x0 >= x1 or y0 >= y1:
+            return frame
+        target = frame[y0:y1, x0:x1, :3]
+        sx0, sy0 = x0 - x, y0 - y
+        sx1, sy1 = sx0 + (x1 - x0), sy0 + (y1 - y0)
+
+        if sprite.opaque:
+            target[...] = sprite.bgr[sy0:sy1, sx0:sx1]
+            return frame
+
+        blend = self._buffer(target.shape)
+        np.multiply(target, sprite.inverse_alpha[sy0:sy1, sx0:sx1], out=blend)
+        blend += sprite.premultiplied[sy0:sy1, sx0:sx1]
+        # Exact rounded division by 255 for values up to 255 * 255.
+        blend += 128
+        blend += blend >> 8
+        blend >>= 8
+        np.copyto(target, blend, casting='unsafe')
+        return frame
+
+    def draw_all(self, frame: np.ndarray, sprites: Iterable[Sprite],
+                 positions: Iterable[Tuple[int, int]],
+                 visible: Optional[Iterable[bool]] = None) -> np.ndarray:
+        """
+        Blend a batch of sprites onto a BGR frame in place, in order.
+
+        Args:
+            frame: BGR uint8 frame, modified in place
+            sprites: Prepared sprites
+            positions: (x, y) per sprite, e.g. an (n, 2) array
+            visible: Optional flags per sprite; hidden sprites are skipped
+
+        Returns:
+            The frame
+        """
+        if visible is None:
+            for sprite, position in zip(sprites, positions):
+                self.draw(frame, sprite, position)
+        else:
+            for sprite, position, shown in zip(sprites, positions, visible):
+                if shown:
+                    self.draw(frame, sprite, position)
+        return frame
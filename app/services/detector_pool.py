@@ -0,0 +1,242 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+def tracker_factory(**options):
+    """
+    Build a HandTracker, importing it on first use: it pulls in OpenCV and
+    MediaPipe, which the web process should not load before it needs them.
+
+    Args:
+        **options: Forwarded to HandTracker
+    """
+    from app.services.hand_tracking import HandTracker
+    return HandTracker(**options)
+
+
+class _PoolEntry:
+    """A pooled detector together with its lock and last-use timestamp."""
+
+    __slots__ = ('detector', 'lock', 'last_used', 'evicted', 'closed')
+
+    def __init__(self, detector):
+        self.detector = detector
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.evicted = False
+        self.closed = False
+
+
+class DetectorPool:
+    def __init__(self, max_size: int = 32, idle_timeout: float = 60.0,
+                 factory: Optional[Callable[[], Any]] = None,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        """
+        Keep one warm detector per client session.
+
+        Detectors are created in video (tracking) mode so consecutive frames
+        from the same session reuse MediaPipe's tracker instead of running
+        palm detection from scratch.
+
+        Args:
+            max_size: Maximum number of detectors kept alive at once
+            idle_timeout: Seconds without use after which a detector is evicted
+            factory: Callable building a new detector, defaults to tracker_factory
+            on_evict: Called with the session ID of every detector evicted
+                or discarded, outside the pool lock, e.g. to release other
+                per-session resources
+        """
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.factory = factory or tracker_factory
+        self.on_evict = on_evict
+        # Sessions evicted under the lock, reported to on_evict after it
+        self._evicted: List[str] = []
+        self._entries: 'OrderedDict[str, _PoolEntry]' = OrderedDict()
+        # Warm detectors not bound to a session yet, handed out on misses
+        self._spares: List[Any] = []
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @contextmanager
+    def acquire(self, session_id: str) -> Iterator[Any]:
+        """
+        Borrow the detector bound to a session, creating it if needed.
+
+        The detector is locked for the duration of the ``with`` block, so
+        concurrent frames from the same session are processed one at a time.
+
+        Args:
+            session_id: Key identifying the client session
+
+        Yields:
+            The session's detector
+        """
+        while True:
+            entry = self._get_entry(session_id)
+            self._report_evicted()
+            entry.lock.acquire()
+            if not entry.closed:
+                break
+            # Evicted and closed while we were waiting for it.
+            entry.lock.release()
+        try:
+            yield entry.detector
+        finally:
+            entry.last_used = time.monotonic()
+            entry.lock.release()
+            if entry.evicted:
+                # Evicted while in use, close it now that it is free.
+                self._close_if_free(entry)
+
+    def _get_entry(self, session_id: str) -> _PoolEntry:
+        with self._lock:
+            self._evict_idle()
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+            spare = self._spares.pop() if self._spares else None
+
+        # Build outside the pool lock, graph initialization is slow.
+        entry = _PoolEntry(spare if spare is not None else self.factory())
+
+        with self._lock:
+            existing = self._entries.get(session_id)
+            if existing is not None:
+                # Another request for the same session won the race.
+                self._close_if_free(entry)
+                self._entries.move_to_end(session_id)
+                return existing
+            self._entries[session_id] = entry
+            while len(self._entries) > self.max_size:
+                self._evict(*self._entries.popitem(last=False))
+            return entry
+
+    def _evict_idle(self):
+        if self.idle_timeout is None:
+            return
+        deadline = time.monotonic() - self.idle_timeout
+        while self._entries:
+            session_id, oldest = next(iter(self._entries.items()))
+            if oldest.last_used > deadline:
+                break
+            del self._entries[session_id]
+            self._evict(session_id, oldest)
+
+    def _evict(self, session_id: str, entry: _PoolEntry):
+        self.evictions += 1
+        self._evicted.append(session_id)
+        entry.evicted = True
+        self._close_if_free(entry)
+
+    def _report_evicted(self):
+        if not self._evicted:
+            return
+        with self._lock:
+            evicted, self._evicted = self._evicted, []
+        if self.on_evict is not None:
+            for session_id in evicted:
+                self.on_evict(session_id)
+
+    @staticmethod
+    def _close_if_free(entry: _PoolEntry):
+        # Whoever releases the entry last after eviction closes it.
+        if not entry.lock.acquire(blocking=False):
+            return
+        try:
+            if not entry.closed:
+                entry.closed = True
+                close = getattr(entry.detector, 'close', None)
+                if close is not None:
+                    close()
+        finally:
+            entry.lock.release()
+
+    def warmup(self, count: int) -> int:
+        """
+        Build detectors ahead of time, so new sessions skip graph
+        initialization on their first frame.
+
+        Each detector also processes one blank frame if it has a
+        ``warmup()`` method, which loads the models and allocates the
+        graph's buffers.
+
+        Args:
+            count: Number of spare detectors to keep, capped at max_size
+
+        Returns:
+            Number of spare detectors available
+        """
+        while True:
+            with self._lock:
+                spares = len(self._spares)
+                if spares >= count or spares + len(self._entries) >= self.max_size:
+                    return spares
+            detector = self.factory()
+            warmup = getattr(detector, 'warmup', None)
+            if warmup is not None:
+                warmup()
+            with self._lock:
+                self._spares.append(detector)
+
+    def discard(self, session_id: str):
+        """
+        Drop the detector of a session, e.g. when its client disconnects.
+        """
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self._evict(session_id, entry)
+        self._report_evicted()
+
+    def clear(self):
+        """
+        Evict every pooled detector and close the spares.
+        """
+        with self._lock:
+            while self._entries:
+                self._evict(*self._entries.popitem(last=False))
+            spares, self._spares = self._spares, []
+        self._report_evicted()
+        for detector in spares:
+            close = getattr(detector, 'close', None)
+            if close is not None:
+                close()
+
+    def detectors(self) -> List[Any]:
+        """
+        Return a snapshot of the live detectors, e.g. to aggregate their stats.
+        """
+        with self._lock:
+            return [entry.detector for entry in self._entries.values()]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return pool counters for sizing under load.
+
+        Returns:
+            Dictionary containing:
+            - 'size': Number of live detectors
+            - 'spares': Warm detectors waiting for a session
+            - 'max_size': Configured capacity
+            - 'hits': Requests served by an existing detector
+            - 'misses': Requests that had to build a detector
+            - 'evictions': Detectors dropped by LRU, idle timeout or discard
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'spares': len(self._spares),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
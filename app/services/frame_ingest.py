@@ -0,0 +1,64 @@
+from typing import Optional
+
+import cv2
+import numpy as np
+
+# imdecode flags per downscale factor. For JPEG, libjpeg scales during the
+# inverse DCT, so reduced frames decode several times faster.
+_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+class FrameIngest:
+    def __init__(self, scale: int = 1):
+        """
+        Decode uploaded frames straight into MediaPipe's RGB input.
+
+        Args:
+            scale: Downscale factor applied while decoding, 1, 2, 4 or 8
+        """
+        self.scale = scale
+
+    @property
+    def scale(self) -> int:
+        return self._scale
+
+    @scale.setter
+    def scale(self, scale: int):
+        if scale not in _DECODE_FLAGS:
+            raise ValueError(f"decode scale must be one of {sorted(_DECODE_FLAGS)}, got {scale}")
+        self._scale = scale
+
+    def decode_rgb(self, buffer) -> Optional[np.ndarray]:
+        """
+        Decode an encoded frame into an RGB image.
+
+        The buffer is wrapped without copying, decoded at the reduced scale,
+        and its channels are swapped in place, so the decoded array is the
+        only allocation.
+
+        Args:
+            buffer: Encoded JPEG/WebP/PNG bytes, bytearray or memoryview
+
+        Returns:
+            RGB image, or None if the buffer cannot be decoded
+        """
+        img = self.decode_bgr(buffer)
+        if img is None:
+            return None
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
+
+    def decode_bgr(self, buffer) -> Optional[np.ndarray]:
+        """
+        Decode an encoded frame at the reduced scale, in OpenCV's BGR order.
+
+        Returns:
+            BGR image, or None if the buffer cannot be decoded
+        """
+        if not len(buffer):
+            return None
+        return cv2.imdecode(np.frombuffer(buffer, np.uint8), _DECODE_FLAGS[self._scale])
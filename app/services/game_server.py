@@ -0,0 +1,183 @@
+import asyncio
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+if TYPE_CHECKING:
+    from app.services.game_sessions import GameSession
+    from app.services.hand_detection import HandResult
+
+# Message types of the binary state stream
+MSG_SNAPSHOT = 1
+MSG_DELTA = 2
+MSG_END = 3
+
+
+class _Subscriber:
+    """Bounded message queue of one connected client."""
+
+    def __init__(self, maxsize: int = 8, notify: Optional[Callable[[], None]] = None):
+        self.messages: 'queue.Queue[Optional[bytes]]' = queue.Queue(maxsize)
+        # Called on the game loop after every new message
+        self.notify = notify
+
+    def push(self, session: 'GameSession', message: bytes):
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full:
+            # Too slow for deltas: drop the backlog and resync with a snapshot.
+            self._drain()
+            self.messages.put_nowait(session.encode(MSG_SNAPSHOT))
+        if self.notify is not None:
+            self.notify()
+
+    def close(self):
+        # Keep the final messages, drop the oldest if there is no room left.
+        while True:
+            try:
+                self.messages.put_nowait(None)
+                break
+            except queue.Full:
+                try:
+                    self.messages.get_nowait()
+                except queue.Empty:
+                    pass
+        if self.notify is not None:
+            self.notify()
+
+    def _drain(self):
+        while True:
+            try:
+                self.messages.get_nowait()
+            except queue.Empty:
+                return
+
+
+class GameServer:
+    def __init__(self, tick_rate: float = 30.0, send_every: int = 1):
+        """
+        Run every game session on one asyncio event loop.
+
+        Each session ticks at a fixed rate, independent of how often frames
+        are detected or rendered; clients receive compact state deltas.
+
+        Args:
+            tick_rate: Simulation steps per second
+            send_every: Broadcast a delta every N ticks
+        """
+        self.tick_rate = tick_rate
+        self.send_every = max(1, send_every)
+        self.sessions: Dict[str, 'GameSession'] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='game-loop', daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def start(self, session_id: str, **options) -> 'GameSession':
+        """
+        Start a game for a session, replacing any previous one.
+
+        Args:
+            session_id: Client session the game belongs to
+            **options: Forwarded to GameSession
+
+        Returns:
+            The new session
+        """
+        # Imported here: sessions need NumPy, the server itself does not.
+        from app.services.game_sessions import GameSession
+
+        session = GameSession(session_id, **options)
+        with self._lock:
+            previous = self.sessions.get(session_id)
+            self.sessions[session_id] = session
+        if previous is not None:
+            previous.duration = previous.elapsed
+        loop = self._ensure_loop()
+        asyncio.run_coroutine_threadsafe(self._run(session), loop)
+        return session
+
+    async def _run(self, session: 'GameSession'):
+        dt = 1.0 / self.tick_rate
+        next_tick = time.monotonic()
+        try:
+            while not session.finished:
+                session.step(dt)
+                if session.tick % self.send_every == 0 and session.subscribers:
+                    message = session.encode(MSG_DELTA)
+                    for subscriber in list(session.subscribers):
+                        subscriber.push(session, message)
+                next_tick += dt
+                delay = next_tick - time.monotonic()
+                if delay < -1.0:
+                    # Fell far behind, e.g. after a stall: skip instead of bursting.
+                    next_tick = time.monotonic()
+                    delay = 0
+                await asyncio.sleep(max(delay, 0))
+            message = session.encode(MSG_END)
+            for subscriber in list(session.subscribers):
+                subscriber.push(session, message)
+        finally:
+            session.running = False
+            for subscriber in list(session.subscribers):
+                subscriber.close()
+            with self._lock:
+                if self.sessions.get(session.session_id) is session:
+                    del self.sessions[session.session_id]
+
+    def get(self, session_id: str) -> Optional['GameSession']:
+        return self.sessions.get(session_id)
+
+    def feed(self, session_id: str, result: 'HandResult'):
+        """
+        Pass a detection result to the session's game, if one is running.
+        """
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.update_hands(result)
+
+    def subscribe(self, session: 'GameSession',
+                  notify: Optional[Callable[[], None]] = None) -> _Subscriber:
+        """
+        Register a client for a session's state stream, starting with a
+        full snapshot.
+
+        The snapshot is taken on the game loop between two ticks, never
+        while a tick is changing the field.
+
+        Args:
+            session: Game to follow
+            notify: Called on the game loop thread whenever a message is
+                queued, e.g. to wake a coroutine waiting on another loop;
+                without it the client polls subscriber.messages
+        """
+        subscriber = _Subscriber(notify=notify)
+
+        def register():
+            subscriber.push(session, session.encode(MSG_SNAPSHOT))
+            if session.running:
+                session.subscribers.append(subscriber)
+            else:
+                # The game already ended and sent its END to the others.
+                subscriber.push(session, session.encode(MSG_END))
+                subscriber.close()
+
+        self._ensure_loop().call_soon_threadsafe(register)
+        return subscriber
+
+    def unsubscribe(self, session: 'GameSession', subscriber: _Subscriber):
+        if subscriber in session.subscribers:
+            session.subscribers.remove(subscriber)
+
+    def stop(self, session: 'GameSession'):
+        """
+        End a game at its next tick.
+        """
+        session.duration = min(session.duration, session.elapsed)
@@ -0,0 +1,116 @@
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.services.balloon_sim import BalloonField
+from app.services.game_server import MSG_DELTA
+from app.services.gestures import compute_gestures
+from app.services.hand_detection import HandResult
+
+# type, tick, remaining milliseconds, n_sprites, n_records
+_HEADER = struct.Struct('<BIIBH')
+# One record per balloon whose state changed, in play-area pixels
+BALLOON_RECORD = np.dtype([
+    ('index', '<u2'),
+    ('x', '<u2'),
+    ('y', '<u2'),
+    ('sprite', 'u1'),
+    ('visible', 'u1'),
+])
+
+
+class GameSession:
+    def __init__(self, session_id: str, n_balloons: int = 5, n_sprites: int = 5,
+                 area: Tuple[int, int] = (1280, 720), balloon_size: Tuple[int, int] = (100, 100),
+                 duration: float = 60.0, seed: Optional[int] = None):
+        """
+        Server-side state of one balloon game.
+
+        Args:
+            session_id: Client session the game belongs to
+            n_balloons: Number of balloons in play
+            n_sprites: Number of balloon colors
+            area: (width, height) of the play area in pixels
+            balloon_size: (width, height) of each balloon in pixels
+            duration: Game length in seconds
+            seed: Random seed, for reproducible games
+        """
+        self.session_id = session_id
+        self.area = area
+        self.duration = duration
+        self.n_sprites = n_sprites
+        self.elapsed = 0.0
+        self.tick = 0
+        self.field = BalloonField(n_balloons, area, size=balloon_size, n_sprites=n_sprites, seed=seed)
+        self.captured = np.zeros(n_sprites, dtype=np.uint16)
+        # Latest hands from the detection pipeline, normalized palm centers
+        self.hands = np.empty((0, 2), dtype=np.float32)
+        self.closed = np.empty(0, dtype=bool)
+        self.subscribers = []
+        # Until the game loop has sent END and closed the subscribers
+        self.running = True
+        self._sent = np.zeros(n_balloons, dtype=BALLOON_RECORD)
+
+    @property
+    def finished(self) -> bool:
+        return self.elapsed >= self.duration
+
+    def update_hands(self, result: HandResult):
+        """
+        Take the hands of a new detection result. Called from request threads;
+        both arrays are replaced in one assignment, never mutated.
+        """
+        gestures = compute_gestures(result.landmarks, result.image_shape)
+        self.hands, self.closed = gestures.palm_center, gestures.closed
+
+    def step(self, dt: float):
+        """
+        Advance the game by one fixed timestep.
+        """
+        self.tick += 1
+        self.elapsed += dt
+        field = self.field
+        field.step(dt, self.elapsed)
+        hands, closed = self.hands, self.closed
+        caught = field.collide(hands * np.array(self.area, dtype=np.float32), closed, self.elapsed)
+        if len(caught):
+            np.add.at(self.captured, field.sprite[caught], 1)
+
+    def _records(self) -> np.ndarray:
+        field = self.field
+        records = np.empty(field.count, dtype=BALLOON_RECORD)
+        records['index'] = np.arange(field.count)
+        records['x'] = field.position[:, 0]
+        records['y'] = field.position[:, 1]
+        records['sprite'] = field.sprite
+        records['visible'] = field.visible
+        return records
+
+    def encode(self, kind: int) -> bytes:
+        """
+        Encode the game state for clients.
+
+        Snapshots carry every balloon; deltas only those whose quantized
+        state changed since the last delta.
+
+        Layout (little endian):
+            uint8  type (1 snapshot, 2 delta, 3 end)
+            uint32 tick
+            uint32 remaining milliseconds
+            uint8  n_sprites
+            uint16 n_records
+            uint16 captured[n_sprites]
+            records[n_records]: uint16 index, x, y; uint8 sprite, visible
+        """
+        records = self._records()
+        if kind == MSG_DELTA:
+            changed = records != self._sent
+            self._sent = records
+            records = records[changed]
+        remaining = int(max(self.duration - self.elapsed, 0.0) * 1000)
+        return b''.join((
+            _HEADER.pack(kind, self.tick, remaining, self.n_sprites, len(records)),
+            self.captured.astype('<u2').tobytes(),
+            records.tobytes()
+        ))
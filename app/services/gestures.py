@@ -0,0 +1,86 @@
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+FINGER_NAMES = ('thumb', 'index', 'middle', 'ring', 'pinky')
+FINGER_TIPS = np.array([4, 8, 12, 16, 20])
+# Joint each tip is compared against, and the point both distances are
+# measured from. The thumb folds across the palm, so it is measured from the
+# index knuckle instead of the wrist.
+FINGER_JOINTS = np.array([3, 6, 10, 14, 18])
+FINGER_REFERENCES = np.array([5, 0, 0, 0, 0])
+PALM_POINTS = np.array([0, 5, 9, 13, 17])
+WRIST = 0
+MIDDLE_KNUCKLE = 9
+
+
+class GestureFeatures(NamedTuple):
+    """Per-hand gesture features, one row per detected hand."""
+    extended: np.ndarray     # (n_hands, 5) bool, thumb to pinky
+    closed: np.ndarray       # (n_hands,) bool, closed fist
+    pinch: np.ndarray        # (n_hands,) float32 thumb-index distance / palm size
+    palm_center: np.ndarray  # (n_hands, 2) float32 normalized x, y
+
+
+def compute_gestures(landmarks: np.ndarray,
+                     image_shape: Optional[Tuple[int, int]] = None) -> GestureFeatures:
+    """
+    Compute gesture features for all hands in one vectorized pass.
+
+    Args:
+        landmarks: (n_hands, 21, 3) array of normalized coordinates
+        image_shape: Tuple of (height, width), used to correct the aspect
+            ratio of normalized coordinates before measuring distances
+
+    Returns:
+        GestureFeatures with one row per hand
+    """
+    points = landmarks[..., :2]
+    if image_shape is not None:
+        height, width = image_shape
+        points = points * np.array((width / height, 1.0), dtype=np.float32)
+
+    tips = points[:, FINGER_TIPS]
+    joints = points[:, FINGER_JOINTS]
+    references = points[:, FINGER_REFERENCES]
+    # A finger is extended when its tip is further from the reference point
+    # than its middle joint; this holds whatever the hand's rotation.
+    tip_distance = np.linalg.norm(tips - references, axis=-1)
+    joint_distance = np.linalg.norm(joints - references, axis=-1)
+    extended = tip_distance > joint_distance
+
+    # Same rule as the desktop game: thumb and at least three fingers folded.
+    closed = ~extended[:, 0] & ((~extended[:, 1:]).sum(axis=1) >= 3)
+
+    palm_size = np.linalg.norm(points[:, MIDDLE_KNUCKLE] - points[:, WRIST], axis=-1)
+    pinch_distance = np.linalg.norm(points[:, 4] - points[:, 8], axis=-1)
+    pinch = pinch_distance / np.maximum(palm_size, 1e-6)
+
+    palm_center = landmarks[:, PALM_POINTS, :2].mean(axis=1)
+
+    return GestureFeatures(
+        extended,
+        closed,
+        pinch.astype(np.float32),
+        palm_center.astype(np.float32)
+    )
+
+
+def gestures_to_json(features: GestureFeatures) -> List[Dict[str, Any]]:
+    """
+    Convert gesture features to a JSON-serializable list, one dict per hand.
+    """
+    return [
+        {
+            'closed': closed,
+            'pinch': pinch,
+            'extended': dict(zip(FINGER_NAMES, extended)),
+            'palm_center': palm_center
+        }
+        for extended, closed, pinch, palm_center in zip(
+            features.extended.tolist(),
+            features.closed.tolist(),
+            features.pinch.tolist(),
+            features.palm_center.tolist()
+        )
+    ]
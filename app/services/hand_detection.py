@@ -1,7 +1,51 @@
 import cv2
 import mediapipe as mp
-from mediapipe.python.solutions.drawing_utils import DrawingSpec
-from typing import List, Tuple, Optional, Dict, Any
+import numpy as np
+from functools import lru_cache
+from typing import List, Tuple, Optional, Dict, Any, NamedTuple, Sequence
+
+NUM_LANDMARKS = 21
+# Index of each label in HandResult.handedness
+HAND_TYPES = ('Left', 'Right')
+# Handedness of a hand MediaPipe did not classify
+HAND_UNKNOWN = 255
+
+
+class HandResult(NamedTuple):
+    """Array form of a detection result."""
+    landmarks: np.ndarray   # (n_hands, 21, 3) float32 normalized x, y, z
+    handedness: np.ndarray  # (n_hands,) uint8 index into HAND_TYPES or HAND_UNKNOWN
+    scores: np.ndarray      # (n_hands,) float32 handedness confidence
+    image_shape: Tuple[int, int]  # (height, width)
+    raw_landmarks: Sequence = ()  # MediaPipe landmark objects for drawing
+
+    @property
+    def hand_types(self) -> List[Optional[str]]:
+        # None for hands of unknown handedness
+        return [HAND_TYPES[i] if i < len(HAND_TYPES) else None for i in self.handedness]
+
+    @classmethod
+    def empty(cls, image_shape: Tuple[int, int]) -> 'HandResult':
+        return cls(
+            np.empty((0, NUM_LANDMARKS, 3), dtype=np.float32),
+            np.empty(0, dtype=np.uint8),
+            np.empty(0, dtype=np.float32),
+            image_shape
+        )
+
+
+@lru_cache(maxsize=8)
+def _painter(landmarks_color, connections_color, thickness, circle_radius):
+    # Styles are built once per combination instead of on every frame.
+    try:
+        from app.services.landmark_drawing import LandmarkPainter
+    except ModuleNotFoundError as e:
+        if e.name != 'app':
+            raise
+        # Imported as a sibling module, e.g. by test_hand.py run from app/services
+        from landmark_drawing import LandmarkPainter
+    return LandmarkPainter(landmarks_color, connections_color, thickness, circle_radius)
+
 
 class HandDetector:
     def __init__(self, static_image_mode=False, max_num_hands=2, model_complexity=1, 
@@ -10,14 +54,120 @@ class HandDetector:
         Initialize the HandDetector with MediaPipe Hands.
         """
         self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=static_image_mode,
-            max_num_hands=max_num_hands,
-            model_complexity=model_complexity,
-            min_detection_confidence=min_detection_confidence,
-            min_tracking_confidence=min_tracking_confidence
+        self.static_image_mode = static_image_mode
+        self.max_num_hands = max_num_hands
+        self.model_complexity = model_complexity
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self.hands = self._build_hands()
+        # Reused for the BGR to RGB conversion while the frame size is stable
+        self._rgb_buffer = None
+
+    def _build_hands(self):
+        return self.mp_hands.Hands(
+            static_image_mode=self.static_image_mode,
+            max_num_hands=self.max_num_hands,
+            model_complexity=self.model_complexity,
+            min_detection_confidence=self.min_detection_confidence,
+            min_tracking_confidence=self.min_tracking_confidence
         )
+
+    def close(self):
+        """
+        Release the MediaPipe graph held by this detector.
+        """
+        self.hands.close()
+
+    def warmup(self, shape: Tuple[int, int] = (480, 640)):
+        """
+        Run one blank frame through the graph, so the first real frame does
+        not pay for loading the models.
+        
+        Args:
+            shape: (height, width) of the blank frame
+        """
+        self.hands.process(np.zeros((*shape, 3), dtype=np.uint8))
+
+    def reconfigure(self, model_complexity: Optional[int] = None,
+                    max_num_hands: Optional[int] = None) -> bool:
+        """
+        Switch model complexity or hand count by rebuilding the MediaPipe graph.
+        
+        Rebuilding takes as long as creating a detector, and tracking
+        restarts from palm detection on the next frame.
+        
+        Args:
+            model_complexity: New model complexity, 0 or 1, None keeps it
+            max_num_hands: New maximum number of hands, None keeps it
+            
+        Returns:
+            True if the graph was rebuilt, False if nothing changed
+        """
+        model_complexity = self.model_complexity if model_complexity is None else model_complexity
+        max_num_hands = self.max_num_hands if max_num_hands is None else max_num_hands
+        if (model_complexity, max_num_hands) == (self.model_complexity, self.max_num_hands):
+            return False
+        self.model_complexity = model_complexity
+        self.max_num_hands = max_num_hands
+        hands = self._build_hands()
+        self.hands.close()
+        self.hands = hands
+        return True
+        
+    def find_hands_array(self, img, rgb: bool = False) -> HandResult:
+        """
+        Detect hands in the image and return their landmarks as arrays.
         
+        Args:
+            img: Input image in BGR format
+            rgb: True if img is already RGB, skipping the color conversion
+            
+        Returns:
+            HandResult with a contiguous (n_hands, 21, 3) float32 landmark
+            array plus handedness and score arrays
+        """
+        if rgb:
+            img_rgb = img
+        else:
+            if self._rgb_buffer is None or self._rgb_buffer.shape != img.shape:
+                self._rgb_buffer = np.empty_like(img)
+            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
+        results = self.hands.process(img_rgb)
+        return self.extract_result(results, img.shape[:2])
+
+    @staticmethod
+    def extract_result(results, image_shape: Tuple[int, int]) -> HandResult:
+        """
+        Convert the output of MediaPipe Hands.process into a HandResult.
+        
+        Args:
+            results: Object returned by Hands.process
+            image_shape: Tuple of (height, width) of the processed image
+            
+        Returns:
+            HandResult with the landmarks, handedness and scores as arrays
+        """
+        hands = results.multi_hand_landmarks
+        if not hands:
+            return HandResult.empty(image_shape)
+
+        n_hands = len(hands)
+        landmarks = np.empty((n_hands, NUM_LANDMARKS, 3), dtype=np.float32)
+        handedness = np.full(n_hands, HAND_UNKNOWN, dtype=np.uint8)
+        scores = np.zeros(n_hands, dtype=np.float32)
+
+        for idx, hand_landmarks in enumerate(hands):
+            landmarks[idx] = [(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark]
+            
+            # Get hand type (Left/Right), unknown without a classification
+            if results.multi_handedness and idx < len(results.multi_handedness):
+                classification = results.multi_handedness[idx].classification[0]
+                if classification.label in HAND_TYPES:
+                    handedness[idx] = HAND_TYPES.index(classification.label)
+                scores[idx] = classification.score
+
+        return HandResult(landmarks, handedness, scores, image_shape, list(hands))
+
     def find_hands(self, img) -> Dict[str, Any]:
         """
         Detect hands in the image and return their landmark coordinates.
@@ -28,84 +178,76 @@ class HandDetector:
         Returns:
             Dictionary containing:
             - 'coordinates': List of hand landmarks coordinates (21 points with x, y, z)
-            - 'hand_types': List of hand classifications (Left/Right)
+            - 'hand_types': List of hand classifications (Left/Right, None
+              if unknown)
             - 'landmarks': Raw MediaPipe landmark objects for drawing
             - 'image_shape': Tuple of image height and width
         """
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        results = self.hands.process(img_rgb)
-        
-        all_hands = []
-        hand_types = []
-        raw_landmarks = []
-        
-        if results.multi_hand_landmarks:
-            for idx, hand_landmarks in enumerate(results.multi_hand_landmarks):
-                # Get hand coordinates
-                hand_points = []
-                for landmark in hand_landmarks.landmark:
-                    x, y, z = landmark.x, landmark.y, landmark.z
-                    hand_points.append((x, y, z))
-                
-                all_hands.append(hand_points)
-                raw_landmarks.append(hand_landmarks)
-                
-                # Get hand type (Left/Right)
-                if results.multi_handedness:
-                    hand_type = results.multi_handedness[idx].classification[0].label
-                    hand_types.append(hand_type)
-        
+        result = self.find_hands_array(img)
         return {
-            'coordinates': all_hands,
-            'hand_types': hand_types if hand_types else None,
-            'landmarks': raw_landmarks,
-            'image_shape': img.shape[:2]  # (height, width)
+            'coordinates': [list(map(tuple, hand)) for hand in result.landmarks.tolist()],
+            'hand_types': result.hand_types or None,
+            'landmarks': list(result.raw_landmarks),
+            'image_shape': result.image_shape
         }
     
     @staticmethod
-    def draw_hands(img, detection_result: Dict[str, Any], 
+    def draw_hands(img, detection_result, 
                   landmarks_color=(255, 0, 0), connections_color=(0, 255, 0),
-                  thickness=1, circle_radius=2):
+                  thickness=1, circle_radius=2, inplace=False):
         """
         Draw hand landmarks and connections on the image.
         
         Args:
             img: Input image
-            detection_result: Dictionary returned by find_hands()
+            detection_result: Dictionary returned by find_hands() or HandResult
             landmarks_color: Color for landmark points (BGR format)
             connections_color: Color for connections between landmarks (BGR format)
             thickness: Thickness of drawn lines
             circle_radius: Radius of landmark circles
+            inplace: Draw into img itself instead of a copy
             
         Returns:
             Image with drawings
         """
-        img_copy = img.copy()
+        if not isinstance(detection_result, HandResult):
+            coordinates = np.asarray(detection_result['coordinates'], dtype=np.float32)
+            detection_result = HandResult(coordinates.reshape(-1, NUM_LANDMARKS, 3),
+                                          np.empty(0, np.uint8), np.empty(0, np.float32),
+                                          detection_result['image_shape'])
+        painter = _painter(tuple(landmarks_color), tuple(connections_color), thickness, circle_radius)
+        return painter.draw(img if inplace else img.copy(), detection_result)
+    
+    @staticmethod
+    def to_pixels(landmarks: np.ndarray, image_shape: Tuple[int, int]) -> np.ndarray:
+        """
+        Convert normalized landmarks of any number of hands to pixel coordinates.
         
-        if detection_result['landmarks']:
-            mp_draw = mp.solutions.drawing_utils
-            mp_hands = mp.solutions.hands
-            
-            landmarks_style = DrawingSpec(
-                color=landmarks_color,
-                thickness=thickness,
-                circle_radius=circle_radius
-            )
-            connections_style = DrawingSpec(
-                color=connections_color,
-                thickness=thickness
-            )
+        Args:
+            landmarks: (..., 3) or (..., 2) array of normalized coordinates
+            image_shape: Tuple of (height, width)
             
-            for hand_landmarks in detection_result['landmarks']:
-                mp_draw.draw_landmarks(
-                    img_copy,
-                    hand_landmarks,
-                    mp_hands.HAND_CONNECTIONS,
-                    landmarks_style,
-                    connections_style
-                )
+        Returns:
+            (..., 2) int32 array of pixel coordinates (x, y)
+        """
+        height, width = image_shape
+        scale = np.array((width, height), dtype=np.float32)
+        return (landmarks[..., :2] * scale).astype(np.int32)
+
+    @staticmethod
+    def bounding_boxes(landmarks: np.ndarray, image_shape: Tuple[int, int]) -> np.ndarray:
+        """
+        Compute the pixel bounding box of every hand at once.
         
-        return img_copy
+        Args:
+            landmarks: (n_hands, 21, 3) array of normalized coordinates
+            image_shape: Tuple of (height, width)
+            
+        Returns:
+            (n_hands, 4) int32 array of (x1, y1, x2, y2)
+        """
+        pixels = HandDetector.to_pixels(landmarks, image_shape)
+        return np.concatenate((pixels.min(axis=1), pixels.max(axis=1)), axis=1)
     
     @staticmethod
     def get_pixel_coordinates(coordinates: List[Tuple[float, float, float]], 
@@ -120,12 +262,5 @@ class HandDetector:
         Returns:
             List of pixel coordinates (x, y)
         """
-        height, width = image_shape
-        pixel_coords = []
-        
-        for x, y, _ in coordinates:
-            pixel_x = int(x * width)
-            pixel_y = int(y * height)
-            pixel_coords.append((pixel_x, pixel_y))
-            
-        return pixel_coords
\ No newline at end of file
+        points = np.asarray(coordinates, dtype=np.float32).reshape(-1, 3)
+        return list(map(tuple, HandDetector.to_pixels(points, image_shape).tolist()))
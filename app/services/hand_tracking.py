@@ -0,0 +1,376 @@
+import math
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.frame_ingest import FrameIngest
+from app.services.hand_detection import HandDetector, HandResult
+from app.services.landmark_filter import OneEuroFilter
+from app.services.motion_gate import MotionGate
+from app.services.quality import QualityController, inference_load, quality_levels
+from app.services.roi import hands_roi, roi_to_frame
+
+
+def frame_times(count: int, timestamps: Optional[Sequence[float]] = None,
+                fps: float = 30.0, end: Optional[float] = None) -> List[float]:
+    """
+    Place a group of consecutive frames on the time.monotonic() clock.
+
+    The last frame is put at end and the others before it, keeping the
+    spacing of the client's own capture times when given, otherwise one
+    frame every 1/fps seconds.
+
+    Args:
+        count: Number of frames
+        timestamps: Capture times in seconds per frame, on any clock
+        fps: Nominal frame rate used without timestamps
+        end: Time of the last frame, defaults to time.monotonic()
+
+    Returns:
+        Time per frame, oldest first
+
+    Raises:
+        ValueError: If timestamps has not one finite entry per frame or
+            decreases, or fps is not positive
+    """
+    if end is None:
+        end = time.monotonic()
+    if timestamps is None:
+        if not 0 < fps < math.inf:
+            raise ValueError("fps must be positive")
+        return [end - (count - 1 - index) / fps for index in range(count)]
+    if len(timestamps) != count:
+        raise ValueError(f"{len(timestamps)} timestamps for {count} frames")
+    if not all(map(math.isfinite, timestamps)):
+        raise ValueError("timestamps must be finite")
+    if any(later < earlier for earlier, later in zip(timestamps, timestamps[1:])):
+        raise ValueError("timestamps must not decrease")
+    return [end - (timestamps[-1] - timestamp) for timestamp in timestamps]
+
+
+class HandTracker:
+    def __init__(self, detector: Optional[HandDetector] = None, infer_every: int = 1,
+                 latency_budget: Optional[float] = None, max_extrapolation: float = 0.25,
+                 smoothing: bool = True, min_cutoff: float = 1.0, beta: float = 10.0,
+                 motion_threshold: Optional[float] = None, motion_max_age: float = 5.0,
+                 roi_margin: Optional[float] = None, roi_refresh: int = 15,
+                 decode_scale: int = 1, latency_target: Optional[float] = None):
+        """
+        Per-session hand tracking on top of a HandDetector.
+
+        Landmarks are smoothed with a One Euro filter, and on frames where
+        inference is skipped they are extrapolated from the filtered
+        velocity instead of running MediaPipe. With a motion threshold set,
+        frames of an unchanged scene reuse the previous result outright.
+        With an ROI margin set, inference runs on a crop around the hands
+        found last time and falls back to the full frame when they are lost.
+        Crops go through a separate static-image detector, so they never
+        disturb the tracking state of the full-frame graph.
+        With a latency target set, model complexity, decode scale and
+        maximum hand count are lowered while inference is too slow or the
+        process is overloaded, and raised again once there is headroom; a
+        new decode scale restarts tracking from a full-frame inference.
+
+        Args:
+            detector: Detector to run, a new tracking-mode HandDetector by default
+            infer_every: Run inference on one frame out of every N
+            latency_budget: Average seconds of inference allowed per frame;
+                frames are skipped so that the budget is respected. Overrides
+                infer_every when set
+            max_extrapolation: Longest time in seconds landmarks are
+                extrapolated before inference is forced
+            smoothing: Whether to filter landmarks at all
+            min_cutoff: One Euro minimum cutoff frequency in Hz
+            beta: One Euro speed coefficient
+            motion_threshold: Gray-level difference of the most changed
+                thumbnail cell under which a frame is considered unchanged,
+                None disables motion gating
+            motion_max_age: Seconds a result is reused for a static scene
+            roi_margin: Padding around the last hands, as a fraction of their
+                size, None always processes the full frame
+            roi_refresh: Run a full-frame inference after this many crops,
+                so hands entering elsewhere are picked up
+            decode_scale: Downscale factor for encoded frames passed to
+                find_hands_encoded(), 1, 2, 4 or 8
+            latency_target: Seconds of decode plus inference per frame to
+                adapt quality to, None keeps the configured quality
+        """
+        self.detector = detector or HandDetector()
+        self.infer_every = max(1, infer_every)
+        self.latency_budget = latency_budget
+        self.max_extrapolation = max_extrapolation
+        self.smoothing = smoothing
+        self.filter = OneEuroFilter(min_cutoff=min_cutoff, beta=beta)
+        self.motion_gate = None
+        if motion_threshold is not None:
+            self.motion_gate = MotionGate(threshold=motion_threshold, max_age=motion_max_age)
+        self.ingest = FrameIngest(decode_scale)
+        self.quality = None
+        if latency_target is not None:
+            self.quality = QualityController(latency_target, quality_levels(
+                self.detector.model_complexity, decode_scale, self.detector.max_num_hands
+            ))
+        self.roi_margin = roi_margin
+        self.roi_detector: Optional[HandDetector] = None
+        if roi_margin is not None:
+            self.roi_detector = HandDetector(
+                static_image_mode=True,
+                max_num_hands=self.detector.max_num_hands,
+                model_complexity=self.detector.model_complexity,
+                min_detection_confidence=self.detector.min_detection_confidence
+            )
+        self.roi_refresh = roi_refresh
+        self._crops_since_full = 0
+        self.last_result: Optional[HandResult] = None
+        self.inference_time = 0.0  # moving average, seconds
+        self._frames_since_inference = 0
+        self._last_inference_at = 0.0
+        self._budget_credit = 0.0
+        self.frames = 0
+        self.inferences = 0
+        self.static_frames = 0
+        self.roi_inferences = 0
+        # Seconds spent per stage on the last frame, for instrumentation
+        self.timings: Dict[str, float] = {}
+
+    def close(self):
+        """
+        Release the underlying detectors.
+        """
+        self.detector.close()
+        if self.roi_detector is not None:
+            self.roi_detector.close()
+
+    def warmup(self):
+        """
+        Warm up the underlying detectors without touching the tracking state.
+        """
+        self.detector.warmup()
+        if self.roi_detector is not None:
+            self.roi_detector.warmup()
+
+    def _should_infer(self, timestamp: float) -> bool:
+        if timestamp - self._last_inference_at > self.max_extrapolation:
+            return True
+
+        if self.latency_budget is not None:
+            # Token bucket: every frame earns the budget, inference spends
+            # what it actually cost.
+            self._budget_credit = min(self._budget_credit + self.latency_budget,
+                                      max(self.inference_time, self.latency_budget) * 2)
+            return self._budget_credit >= self.inference_time
+        return self._frames_since_inference + 1 >= self.infer_every
+
+    def find_hands_encoded(self, buffer, timestamp: Optional[float] = None) -> Optional[HandResult]:
+        """
+        Decode an uploaded frame at the configured scale and track hands in it.
+
+        Args:
+            buffer: Encoded JPEG/WebP/PNG bytes, bytearray or memoryview
+            timestamp: Frame time in seconds, defaults to time.monotonic()
+
+        Returns:
+            HandResult, or None if the buffer cannot be decoded
+        """
+        start = time.perf_counter()
+        img = self.ingest.decode_rgb(buffer)
+        timings = {'decode': time.perf_counter() - start}
+        if img is None:
+            self.timings = timings
+            return None
+        return self._track(img, timestamp, True, timings)
+
+    def track_encoded(self, buffers: Sequence, executor: Optional[Executor] = None,
+                      timestamps: Optional[Sequence[float]] = None, fps: float = 30.0,
+                      max_in_flight: int = 4) -> Iterator[Optional[HandResult]]:
+        """
+        Track hands across consecutive encoded frames of this session.
+
+        Frames are decoded on the executor, up to max_in_flight ahead of the
+        one being tracked, in parallel with each other and with the
+        inference of the earlier ones, then tracked in order as if they had
+        been passed to find_hands_encoded() one by one. After each result,
+        timings holds the stages of that frame.
+
+        Args:
+            buffers: Encoded frames, oldest first
+            executor: Pool to decode on, decodes inline when None
+            timestamps: Frame times in seconds on the time.monotonic()
+                clock, see frame_times(). By default frames are spaced 1/fps
+                apart, the last one now
+            fps: Nominal frame rate used without timestamps
+            max_in_flight: Most frames decoded or waiting to be tracked at once
+
+        Yields:
+            HandResult per frame, or None if its buffer cannot be decoded
+        """
+        if timestamps is None:
+            timestamps = frame_times(len(buffers), fps=fps)
+        if executor is None:
+            for buffer, timestamp in zip(buffers, timestamps):
+                yield self.find_hands_encoded(buffer, timestamp)
+            return
+
+        def decode(buffer):
+            start = time.perf_counter()
+            img = self.ingest.decode_rgb(buffer)
+            return img, time.perf_counter() - start
+
+        frames = iter(zip(buffers, timestamps))
+        pending = deque()
+        while True:
+            # Decoded frames are full-size images, so only a few are kept
+            # ahead; the next frame to track counts as one of them.
+            while len(pending) < max(1, max_in_flight):
+                frame = next(frames, None)
+                if frame is None:
+                    break
+                pending.append((executor.submit(decode, frame[0]), frame[1]))
+            if not pending:
+                break
+            future, timestamp = pending.popleft()
+            img, elapsed = future.result()
+            timings = {'decode': elapsed}
+            if img is None:
+                self.timings = timings
+                yield None
+            else:
+                yield self._track(img, timestamp, True, timings)
+
+    def find_hands_array(self, img, timestamp: Optional[float] = None,
+                         rgb: bool = False) -> HandResult:
+        """
+        Detect, smooth or extrapolate the hands for one frame.
+
+        Args:
+            img: Input image in BGR format
+            timestamp: Frame time in seconds, defaults to time.monotonic()
+            rgb: True if img is already RGB
+
+        Returns:
+            HandResult with smoothed or extrapolated landmarks. Extrapolated
+            results carry no raw MediaPipe landmarks
+        """
+        return self._track(img, timestamp, rgb, {})
+
+    def _track(self, img, timestamp: Optional[float], rgb: bool,
+               timings: Dict[str, float]) -> HandResult:
+        if timestamp is None:
+            timestamp = time.monotonic()
+        self.frames += 1
+        self.timings = timings
+
+        if self.last_result is not None and self.motion_gate is not None:
+            start = time.perf_counter()
+            static = self.motion_gate.is_static(img, timestamp)
+            timings['motion_gate'] = time.perf_counter() - start
+            if static:
+                # Nothing moved, the previous result still holds.
+                self.static_frames += 1
+                return self.last_result._replace(image_shape=img.shape[:2])
+
+        if self.last_result is not None and not self._should_infer(timestamp):
+            self._frames_since_inference += 1
+            start = time.perf_counter()
+            result = self._extrapolate(timestamp, img.shape[:2])
+            timings['extrapolation'] = time.perf_counter() - start
+            return result
+
+        start = time.perf_counter()
+        with inference_load.track():
+            result = self._infer(img, rgb)
+        elapsed = time.perf_counter() - start
+        timings['inference'] = elapsed
+        self.inference_time = elapsed if not self.inferences else 0.8 * self.inference_time + 0.2 * elapsed
+        self._budget_credit -= elapsed
+        self.inferences += 1
+        self._frames_since_inference = 0
+        self._last_inference_at = timestamp
+
+        start = time.perf_counter()
+        result = self._smooth(result, timestamp)
+        timings['smoothing'] = time.perf_counter() - start
+        self.last_result = result
+        if self.motion_gate is not None:
+            self.motion_gate.accept()
+
+        if self.quality is not None:
+            level = self.quality.update(elapsed + timings.get('decode', 0.0), timestamp)
+            if level is not None:
+                if level.decode_scale != self.ingest.scale:
+                    self._restart_tracking()
+                self.ingest.scale = level.decode_scale
+                self.detector.reconfigure(level.model_complexity, level.max_num_hands)
+                if self.roi_detector is not None:
+                    self.roi_detector.reconfigure(level.model_complexity, level.max_num_hands)
+        return result
+
+    def _restart_tracking(self):
+        """
+        Drop the state tied to the current frame size.
+
+        The motion gate reference, the ROI around the last hands and the
+        filter history all come from frames decoded at the old scale, so
+        the next frame runs a full-frame inference and starts them afresh.
+        """
+        self.last_result = None
+        self._crops_since_full = 0
+        self.filter.reset()
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
+    def _infer(self, img, rgb: bool) -> HandResult:
+        last = self.last_result
+        image_shape = img.shape[:2]
+        roi = None
+        if self.roi_margin is not None and last is not None and self._crops_since_full < self.roi_refresh:
+            roi = hands_roi(last.landmarks, image_shape, self.roi_margin)
+
+        if roi is not None:
+            result = self.roi_detector.find_hands_array(roi.crop(img), rgb)
+            if len(result.landmarks) >= len(last.landmarks):
+                self._crops_since_full += 1
+                self.roi_inferences += 1
+                # Raw landmarks are relative to the crop, so they are dropped.
+                return result._replace(
+                    landmarks=roi_to_frame(result.landmarks, roi, image_shape),
+                    image_shape=image_shape,
+                    raw_landmarks=()
+                )
+            # Lost a hand, look at the whole frame again.
+
+        self._crops_since_full = 0
+        return self.detector.find_hands_array(img, rgb)
+
+    def _smooth(self, result: HandResult, timestamp: float) -> HandResult:
+        last = self.last_result
+        if last is None or not np.array_equal(last.handedness, result.handedness):
+            # Different hands than before, do not blend them together.
+            self.filter.reset()
+        if not self.smoothing or not len(result.landmarks):
+            self.filter.reset()
+            return result
+        return result._replace(landmarks=self.filter(result.landmarks, timestamp))
+
+    def _extrapolate(self, timestamp: float, image_shape) -> HandResult:
+        last = self.last_result
+        predicted = self.filter.predict(timestamp)
+        if predicted is None:
+            return last._replace(image_shape=image_shape)
+        return last._replace(landmarks=predicted, image_shape=image_shape, raw_landmarks=())
+
+    def stats(self):
+        """
+        Return frame and inference counters for this session.
+        """
+        return {
+            'frames': self.frames,
+            'inferences': self.inferences,
+            'static_frames': self.static_frames,
+            'roi_inferences': self.roi_inferences,
+            'inference_time': self.inference_time,
+            'quality_level': self.quality.index if self.quality is not None else 0,
+        }
@@ -0,0 +1,394 @@
+import atexit
+import functools
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.admission import FrameRejected
+from app.services.hand_detection import HandResult
+from app.services.metrics import record_stages, stage_seconds
+
+# Message kinds sent to the worker processes.
+_DETECT = 0
+_DISCARD = 1
+_STOP = 2
+_STATS = 3
+
+
+def _worker_main(shm_name: str, slot_bytes: int, requests, results, warmup: int, pool_kwargs):
+    """
+    Worker process loop: owns one detector pool and serves frames from its
+    shared memory slots. Answers go back on the worker's own results pipe.
+    """
+    from app.services.detector_pool import DetectorPool
+    from app.services.motion_gate import motion_stats
+    from app.services.quality import inference_load
+
+    # One frame at a time here, quality follows latency alone.
+    inference_load.enabled = False
+    shm = shared_memory.SharedMemory(name=shm_name)
+    pool = DetectorPool(**pool_kwargs)
+    # Requests queue up meanwhile, the first ones find warm detectors.
+    pool.warmup(warmup)
+    try:
+        while True:
+            message = requests.get()
+            kind = message[0]
+            if kind == _STOP:
+                break
+            if kind == _DISCARD:
+                pool.discard(message[1])
+                continue
+            if kind == _STATS:
+                # Tracking happens here, so do its counters.
+                results.send((_STATS, message[1], {
+                    'pool': pool.stats(),
+                    'trackers': [detector.stats() for detector in pool.detectors()],
+                    'motion_gate': motion_stats.as_dict()
+                }))
+                continue
+
+            _, request_id, session_id, slot, shape, nbytes, timestamp = message
+            start = time.perf_counter()
+            offset = slot * slot_bytes
+            if shape is None:
+                # Encoded frame, decoded here rather than in the web process.
+                frame = shm.buf[offset:offset + nbytes]
+            else:
+                frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+            try:
+                with pool.acquire(session_id) as detector:
+                    if shape is None:
+                        result = detector.find_hands_encoded(frame, timestamp)
+                    else:
+                        result = detector.find_hands_array(frame, timestamp)
+                timings = dict(getattr(detector, 'timings', {}))
+                busy = time.perf_counter() - start
+                if result is None:
+                    results.send((_DETECT, request_id, None, None, None, None, timings, busy, None))
+                else:
+                    # Only the arrays travel back, protobuf landmarks stay here.
+                    results.send((_DETECT, request_id, result.landmarks, result.handedness, result.scores,
+                                 result.image_shape, timings, busy, None))
+            except Exception as e:
+                results.send((_DETECT, request_id, None, None, None, None, {}, 0.0, repr(e)))
+            finally:
+                del frame
+    finally:
+        pool.clear()
+        shm.close()
+        results.close()
+
+
+class _Worker:
+    """Parent-side handle of one worker process and its frame slots."""
+
+    def __init__(self, ctx, slots: int, slot_bytes: int, warmup: int, pool_kwargs):
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.free_slots: 'queue.Queue[int]' = queue.Queue()
+        for slot in range(slots):
+            self.free_slots.put(slot)
+        self.requests = ctx.Queue()
+        # One pipe per worker rather than a shared queue: a worker killed
+        # while writing to a shared queue would hold its lock forever.
+        self.results, sender = ctx.Pipe(duplex=False)
+        # Set once the process died and a new worker took its place.
+        self.retired = False
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(self.shm.name, slot_bytes, self.requests, sender, warmup, pool_kwargs),
+            daemon=True
+        )
+        self.process.start()
+        # Only the worker holds the sending end, so reads end with EOF once it exits.
+        sender.close()
+
+    def stop(self, timeout: float):
+        self.requests.put((_STOP,))
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.release()
+
+    def release(self):
+        """
+        Free the shared memory once the process is gone.
+        """
+        # A dead process never reads its queue, do not wait on it at exit.
+        self.requests.cancel_join_thread()
+        try:
+            self.shm.close()
+        except BufferError:
+            # A frame is still being copied in; the mapping goes with its view.
+            pass
+        self.shm.unlink()
+
+
+class InferenceService:
+    def __init__(self, num_workers: Optional[int] = None, slots_per_worker: int = 4,
+                 max_frame_shape=(1080, 1920, 3), timeout: float = 10.0,
+                 warmup: int = 0, **pool_kwargs):
+        """
+        Run hand detection in N worker processes, outside the Flask GIL.
+
+        Each worker owns its own detector pool. Frames, raw or still
+        encoded, are copied once into a shared memory slot of the session's
+        worker instead of being pickled, and results come back as HandResult
+        arrays. A
+        session is always routed to the same worker, so its tracker state
+        stays valid. A worker that dies is replaced by a new process on the
+        same slot; its sessions start over with fresh trackers and the
+        frames it was processing fail.
+
+        Args:
+            num_workers: Number of worker processes, defaults to the CPU count
+            slots_per_worker: Frames that can be in flight per worker
+            max_frame_shape: Largest (height, width, channels) frame accepted
+            timeout: Seconds to wait for a slot or a result before failing
+            warmup: Detectors each worker builds and warms up as it starts
+            **pool_kwargs: Forwarded to each worker's DetectorPool
+        """
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_frame_shape = tuple(max_frame_shape)
+        slot_bytes = int(np.prod(self.max_frame_shape))
+
+        ctx = mp.get_context('spawn')
+        # Request ID -> (future, worker, slot) until the worker answers,
+        # slot None for stats requests
+        self._pending: Dict[int, Tuple[Future, _Worker, Optional[int]]] = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._spawn = functools.partial(_Worker, ctx, slots_per_worker, slot_bytes, warmup, pool_kwargs)
+        self._workers: List[_Worker] = [self._spawn() for _ in range(self.num_workers)]
+        self._restart_lock = threading.Lock()
+        # Results pipes of replaced workers, closed by the dispatcher
+        self._stale_pipes = []
+        self.restarts = 0
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+        atexit.register(self.close)
+
+    def _worker_for(self, session_id: str) -> _Worker:
+        # crc32 rather than hash() so the mapping is stable across restarts.
+        return self._worker_at(zlib.crc32(session_id.encode()) % self.num_workers)
+
+    def _worker_at(self, index: int) -> _Worker:
+        worker = self._workers[index]
+        if not worker.process.is_alive():
+            worker = self._restart(index, worker)
+        return worker
+
+    def _restart(self, index: int, dead: _Worker) -> _Worker:
+        with self._restart_lock:
+            if self._closed or self._workers[index] is not dead:
+                # Shutting down, or another thread replaced it already.
+                return self._workers[index]
+            dead.retired = True
+            with self._pending_lock:
+                lost = [request_id for request_id, (_, worker, _) in self._pending.items()
+                        if worker is dead]
+                futures = [self._pending.pop(request_id)[0] for request_id in lost]
+            if dead.process.is_alive():
+                # Closed its pipe but did not exit.
+                dead.process.kill()
+            dead.process.join()
+            dead.release()
+            self._stale_pipes.append(dead.results)
+            worker = self._workers[index] = self._spawn()
+            self.restarts += 1
+        for future in futures:
+            if not future.done():
+                future.set_exception(FrameRejected('worker_restart'))
+        return worker
+
+    def _dispatch(self):
+        while not self._closed:
+            while self._stale_pipes:
+                self._stale_pipes.pop().close()
+            workers = {worker.results: index for index, worker in enumerate(self._workers)}
+            for pipe in wait(list(workers), timeout=1.0):
+                try:
+                    message = pipe.recv()
+                except (EOFError, OSError):
+                    # The worker exited, fail its frames now rather than at timeout.
+                    index = workers[pipe]
+                    worker = self._workers[index]
+                    if worker.results is pipe:
+                        self._restart(index, worker)
+                    continue
+                self._answer(message)
+
+    def _answer(self, message):
+        kind, request_id = message[:2]
+        with self._pending_lock:
+            pending = self._pending.pop(request_id, None)
+        if kind == _STATS:
+            if pending is not None and not pending[0].done():
+                pending[0].set_result(message[2])
+            return
+        landmarks, handedness, scores, image_shape, timings, busy, error = message[2:]
+        # Stages ran in the worker, its metrics are recorded here.
+        record_stages(timings)
+        if pending is None:
+            return
+        future, worker, slot = pending
+        # The worker is done with the slot, even if the caller gave up.
+        worker.free_slots.put(slot)
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(RuntimeError(error))
+        elif landmarks is None:
+            future.set_result((None, busy))
+        else:
+            future.set_result((HandResult(landmarks, handedness, scores, image_shape), busy))
+
+    def find_hands_array(self, session_id: str, img) -> HandResult:
+        """
+        Detect hands in a BGR frame on the session's worker process.
+
+        Args:
+            session_id: Key identifying the client session
+            img: Input image in BGR format
+
+        Returns:
+            HandResult without raw MediaPipe landmarks
+
+        Raises:
+            FrameRejected: If no frame slot of the worker frees up in time,
+                or the worker died while processing the frame
+            TimeoutError: If the worker does not answer in time
+        """
+        worker = self._worker_for(session_id)
+        if img.nbytes > worker.slot_bytes:
+            raise ValueError(f"frame of shape {img.shape} exceeds max_frame_shape {self.max_frame_shape}")
+        return self._submit(worker, session_id, img.shape, img.nbytes,
+                            lambda view: np.copyto(np.ndarray(img.shape, np.uint8, view), img))
+
+    def find_hands_encoded(self, session_id: str, buffer,
+                           timestamp: Optional[float] = None) -> Optional[HandResult]:
+        """
+        Decode and process an encoded frame on the session's worker process.
+
+        Only the compressed bytes are copied into shared memory; decoding
+        happens in the worker.
+
+        Args:
+            session_id: Key identifying the client session
+            buffer: Encoded JPEG/WebP/PNG bytes
+            timestamp: Frame time on the time.monotonic() clock, which the
+                workers share, defaults to when the worker gets the frame
+
+        Returns:
+            HandResult without raw MediaPipe landmarks, or None if the frame
+            cannot be decoded
+
+        Raises:
+            FrameRejected: If no frame slot of the worker frees up in time,
+                or the worker died while processing the frame
+            TimeoutError: If the worker does not answer in time
+        """
+        worker = self._worker_for(session_id)
+        nbytes = len(buffer)
+        if nbytes > worker.slot_bytes:
+            raise ValueError(f"encoded frame of {nbytes} bytes exceeds the {worker.slot_bytes} byte slot")
+
+        def write(view):
+            view[:nbytes] = buffer
+        return self._submit(worker, session_id, None, nbytes, write, timestamp)
+
+    def _submit(self, worker: _Worker, session_id: str, shape, nbytes: int, write,
+                timestamp: Optional[float] = None):
+        start = time.perf_counter()
+        try:
+            slot = worker.free_slots.get(timeout=self.timeout)
+        except queue.Empty:
+            raise FrameRejected('overloaded') from None
+        offset = slot * worker.slot_bytes
+        view = worker.shm.buf[offset:offset + nbytes]
+        try:
+            write(view)
+        except Exception:
+            worker.free_slots.put(slot)
+            raise
+        finally:
+            view.release()
+        request_id = next(self._ids)
+        future = Future()
+        with self._pending_lock:
+            if worker.retired:
+                # Replaced while the frame was being copied in.
+                raise FrameRejected('worker_restart')
+            self._pending[request_id] = (future, worker, slot)
+        worker.requests.put((_DETECT, request_id, session_id, slot, shape, nbytes, timestamp))
+        # The slot goes back to the worker in _dispatch once the answer
+        # arrives, also when it arrives after this call timed out.
+        result, busy = future.result(timeout=self.timeout)
+        # Waiting for a slot, in the worker's queue and on the result pipe.
+        stage_seconds.observe(time.perf_counter() - start - busy, 'queue_wait')
+        return result
+
+    def stats(self, timeout: float = 1.0) -> List[Dict[str, Any]]:
+        """
+        Collect the detector pool, tracker and motion gate counters of the
+        workers.
+
+        Args:
+            timeout: Seconds to wait for all workers together
+
+        Returns:
+            One dictionary per worker that answered in time, with 'pool'
+            (DetectorPool.stats()), 'trackers' (HandTracker.stats() per
+            session) and 'motion_gate' (MotionGateStats.as_dict())
+        """
+        futures = []
+        for index in range(self.num_workers):
+            worker = self._worker_at(index)
+            request_id = next(self._ids)
+            future = Future()
+            with self._pending_lock:
+                self._pending[request_id] = (future, worker, None)
+            worker.requests.put((_STATS, request_id))
+            futures.append(future)
+        deadline = time.monotonic() + timeout
+        stats = []
+        for future in futures:
+            try:
+                stats.append(future.result(timeout=max(0.0, deadline - time.monotonic())))
+            except (TimeoutError, FrameRejected):
+                # Busy or restarting, its counters are left out.
+                pass
+        return stats
+
+    def discard(self, session_id: str):
+        """
+        Drop the detector of a session on its worker.
+        """
+        self._worker_for(session_id).requests.put((_DISCARD, session_id))
+
+    def close(self, timeout: float = 5.0):
+        """
+        Stop all worker processes and release their shared memory.
+        """
+        with self._restart_lock:
+            if self._closed:
+                return
+            self._closed = True
+        # Stops within a second, before the pipes it waits on are closed.
+        self._dispatcher.join(timeout)
+        for worker in self._workers:
+            worker.stop(timeout)
+            worker.results.close()
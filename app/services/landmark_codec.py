@@ -0,0 +1,235 @@
+import struct
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.gestures import GestureFeatures, compute_gestures
+from app.services.hand_detection import HandResult, NUM_LANDMARKS
+
+COMPACT_MIMETYPE = 'application/x-hand-landmarks'
+COMPACT_VERSION = 2
+BATCH_MIMETYPE = 'application/x-hand-landmarks-batch'
+BATCH_VERSION = 1
+
+# Status of each frame of a batch
+FRAME_OK = 0
+FRAME_UNDECODABLE = 1
+FRAME_SKIPPED = 2
+
+# version, n_hands, image width, image height
+_HEADER = struct.Struct('<BBHH')
+# Normalized coordinates may fall slightly outside the frame, z is relative
+# to the wrist. Quantizing [-0.5, 1.5] to uint16 gives ~3e-5 resolution,
+# well below one pixel at 1280x720.
+_LOW = -0.5
+_HIGH = 1.5
+_SCALE = 65535.0 / (_HIGH - _LOW)
+
+# version, reserved, n_frames, total n_hands
+_BATCH_HEADER = struct.Struct('<BBII')
+_FRAME_RECORD = np.dtype([('status', 'u1'), ('n_hands', 'u1'), ('width', '<u2'), ('height', '<u2')])
+_HAND_BYTES = 2 + NUM_LANDMARKS * 3 * 2
+# Gesture flags, pinch and palm center x, y per hand in compact responses
+_GESTURE_BYTES = 1 + 2 + 2 * 2
+# Bit set in the gesture flags for a closed fist, bits 0-4 are the fingers
+_CLOSED_BIT = 5
+_FINGER_BITS = (1 << np.arange(5)).astype(np.uint8)
+# Pinch ratio resolution, saturating at 65.535 palm sizes
+_PINCH_SCALE = 1000.0
+
+
+def _quantize(landmarks: np.ndarray) -> np.ndarray:
+    return np.clip((landmarks - _LOW) * _SCALE + 0.5, 0, 65535).astype('<u2')
+
+
+def _dequantize(quantized: np.ndarray) -> np.ndarray:
+    return quantized.astype(np.float32) / np.float32(_SCALE) + np.float32(_LOW)
+
+
+def encode_compact(result: HandResult) -> bytes:
+    """
+    Pack a detection result into the compact binary response format.
+
+    Carries the same gestures as the JSON response, computed here so
+    clients of the compact format do not have to repeat them.
+
+    Layout (little endian):
+        uint8  version
+        uint8  n_hands
+        uint16 image width
+        uint16 image height
+        uint8  handedness[n_hands]      index into HAND_TYPES, 255 unknown
+        uint8  score[n_hands]           handedness score * 255
+        uint16 landmarks[n_hands][21][3] quantized x, y, z
+        uint8  gestures[n_hands]        bits 0-4 extended thumb to pinky,
+                                        bit 5 closed fist
+        uint16 pinch[n_hands]           pinch * 1000
+        uint16 palm_center[n_hands][2]  quantized x, y
+
+    Args:
+        result: HandResult returned by find_hands_array()
+
+    Returns:
+        Encoded bytes, 6 + 135 bytes per hand
+    """
+    height, width = result.image_shape
+    n_hands = len(result.landmarks)
+    quantized = _quantize(result.landmarks)
+    scores = np.clip(result.scores * 255.0 + 0.5, 0, 255).astype(np.uint8)
+    gestures = compute_gestures(result.landmarks, result.image_shape)
+    flags = (gestures.extended * _FINGER_BITS).sum(axis=1, dtype=np.uint8)
+    flags |= gestures.closed.astype(np.uint8) << _CLOSED_BIT
+    pinch = np.clip(gestures.pinch * _PINCH_SCALE + 0.5, 0, 65535).astype('<u2')
+    return b''.join((
+        _HEADER.pack(COMPACT_VERSION, n_hands, width, height),
+        result.handedness.astype(np.uint8).tobytes(),
+        scores.tobytes(),
+        quantized.tobytes(),
+        flags.tobytes(),
+        pinch.tobytes(),
+        _quantize(gestures.palm_center).tobytes()
+    ))
+
+
+def decode_compact(data: bytes) -> Tuple[HandResult, GestureFeatures]:
+    """
+    Unpack bytes produced by encode_compact().
+
+    Returns:
+        Tuple of (HandResult, GestureFeatures)
+
+    Raises:
+        ValueError: If the buffer is truncated or of an unknown version
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("compact landmark buffer too short")
+    version, n_hands, width, height = _HEADER.unpack_from(data)
+    if version != COMPACT_VERSION:
+        raise ValueError(f"unsupported compact landmark version {version}")
+    expected = _HEADER.size + n_hands * (_HAND_BYTES + _GESTURE_BYTES)
+    if len(data) != expected:
+        raise ValueError(f"compact landmark buffer has {len(data)} bytes, expected {expected}")
+
+    offset = _HEADER.size
+    handedness = np.frombuffer(data, np.uint8, n_hands, offset)
+    scores = np.frombuffer(data, np.uint8, n_hands, offset + n_hands)
+    quantized = np.frombuffer(data, '<u2', n_hands * NUM_LANDMARKS * 3, offset + 2 * n_hands)
+    landmarks = _dequantize(quantized)
+    offset += n_hands * _HAND_BYTES
+    flags = np.frombuffer(data, np.uint8, n_hands, offset)
+    pinch = np.frombuffer(data, '<u2', n_hands, offset + n_hands)
+    palm_center = np.frombuffer(data, '<u2', n_hands * 2, offset + 3 * n_hands)
+    result = HandResult(
+        landmarks.reshape(n_hands, NUM_LANDMARKS, 3),
+        handedness.copy(),
+        scores.astype(np.float32) / 255.0,
+        (height, width)
+    )
+    gestures = GestureFeatures(
+        (flags[:, None] & _FINGER_BITS) != 0,
+        (flags >> _CLOSED_BIT & 1).astype(bool),
+        pinch.astype(np.float32) / np.float32(_PINCH_SCALE),
+        _dequantize(palm_center).reshape(n_hands, 2)
+    )
+    return result, gestures
+
+
+def encode_batch(results: Sequence[Optional[HandResult]],
+                 statuses: Optional[Sequence[int]] = None) -> bytes:
+    """
+    Pack the results of many frames into one buffer of packed arrays.
+
+    Frames keep their order, and every array holds the hands of all frames
+    back to back, so the whole batch is quantized in one pass and can be
+    read with a few numpy.frombuffer() calls.
+
+    Layout (little endian):
+        uint8  version
+        uint8  reserved, 0
+        uint32 n_frames
+        uint32 n_hands                  total over all frames
+        frames[n_frames]:
+            uint8  status               FRAME_OK, FRAME_UNDECODABLE or FRAME_SKIPPED
+            uint8  n_hands
+            uint16 image width
+            uint16 image height
+        uint8  handedness[n_hands]
+        uint8  score[n_hands]
+        uint16 landmarks[n_hands][21][3]
+
+    Args:
+        results: HandResult per frame, None for frames without a result
+        statuses: Status of the frames without a result, FRAME_UNDECODABLE
+            for all of them by default
+
+    Returns:
+        Encoded bytes, 10 + 6 per frame + 128 per hand
+    """
+    records = np.zeros(len(results), _FRAME_RECORD)
+    present = []
+    for index, result in enumerate(results):
+        if result is None:
+            records[index]['status'] = statuses[index] if statuses is not None else FRAME_UNDECODABLE
+            continue
+        height, width = result.image_shape
+        records[index] = (FRAME_OK, len(result.landmarks), width, height)
+        if len(result.landmarks):
+            present.append(result)
+
+    if present:
+        landmarks = np.concatenate([result.landmarks for result in present])
+        handedness = np.concatenate([result.handedness for result in present])
+        scores = np.concatenate([result.scores for result in present])
+    else:
+        landmarks = np.empty((0, NUM_LANDMARKS, 3), np.float32)
+        handedness = scores = np.empty(0, np.float32)
+    return b''.join((
+        _BATCH_HEADER.pack(BATCH_VERSION, 0, len(results), len(landmarks)),
+        records.tobytes(),
+        handedness.astype(np.uint8).tobytes(),
+        np.clip(scores * 255.0 + 0.5, 0, 255).astype(np.uint8).tobytes(),
+        _quantize(landmarks).tobytes()
+    ))
+
+
+def decode_batch(data: bytes) -> List[Tuple[int, Optional[HandResult]]]:
+    """
+    Unpack bytes produced by encode_batch().
+
+    Returns:
+        (status, HandResult) per frame, in order; the result is None unless
+        the status is FRAME_OK
+
+    Raises:
+        ValueError: If the buffer is truncated or of an unknown version
+    """
+    if len(data) < _BATCH_HEADER.size:
+        raise ValueError("batch landmark buffer too short")
+    version, _, n_frames, n_hands = _BATCH_HEADER.unpack_from(data)
+    if version != BATCH_VERSION:
+        raise ValueError(f"unsupported batch landmark version {version}")
+    expected = _BATCH_HEADER.size + n_frames * _FRAME_RECORD.itemsize + n_hands * _HAND_BYTES
+    if len(data) != expected:
+        raise ValueError(f"batch landmark buffer has {len(data)} bytes, expected {expected}")
+
+    offset = _BATCH_HEADER.size
+    records = np.frombuffer(data, _FRAME_RECORD, n_frames, offset)
+    offset += records.nbytes
+    handedness = np.frombuffer(data, np.uint8, n_hands, offset)
+    scores = np.frombuffer(data, np.uint8, n_hands, offset + n_hands).astype(np.float32) / 255.0
+    quantized = np.frombuffer(data, '<u2', n_hands * NUM_LANDMARKS * 3, offset + 2 * n_hands)
+    landmarks = _dequantize(quantized).reshape(n_hands, NUM_LANDMARKS, 3)
+    if int(records['n_hands'].sum()) != n_hands:
+        raise ValueError("batch landmark buffer has inconsistent hand counts")
+
+    frames = []
+    start = 0
+    for status, count, width, height in records.tolist():
+        if status != FRAME_OK:
+            frames.append((status, None))
+            continue
+        end = start + count
+        frames.append((status, HandResult(landmarks[start:end], handedness[start:end].copy(),
+                                          scores[start:end], (height, width))))
+        start = end
+    return frames
@@ -0,0 +1,81 @@
+from typing import TYPE_CHECKING, Tuple
+
+import cv2
+import numpy as np
+
+if TYPE_CHECKING:
+    from app.services.hand_detection import HandResult
+
+# Same topology as mediapipe.solutions.hands.HAND_CONNECTIONS, without
+# importing MediaPipe.
+HAND_CONNECTIONS = np.array([
+    (0, 1), (1, 2), (2, 3), (3, 4),
+    (0, 5), (5, 6), (6, 7), (7, 8),
+    (5, 9), (9, 10), (10, 11), (11, 12),
+    (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+], dtype=np.intp)
+
+# Border color of the points, as in MediaPipe
+_BORDER = (224, 224, 224)
+
+
+class LandmarkPainter:
+    def __init__(self, landmarks_color: Tuple[int, int, int] = (255, 0, 0),
+                 connections_color: Tuple[int, int, int] = (0, 255, 0),
+                 thickness: int = 1, circle_radius: int = 2):
+        """
+        Draw hand landmarks the way MediaPipe's draw_landmarks does, from
+        HandResult arrays, with the style fixed once.
+
+        The connections of each hand are drawn in one polylines call. Results
+        without raw MediaPipe landmarks, such as extrapolated ones or those
+        returned by worker processes, are drawn too. As in MediaPipe,
+        landmarks outside the image are skipped along with their
+        connections, rather than drawn clipped at the edge.
+
+        Args:
+            landmarks_color: Color for landmark points (BGR format)
+            connections_color: Color for connections between landmarks (BGR format)
+            thickness: Thickness of drawn lines
+            circle_radius: Radius of landmark circles
+        """
+        self.landmarks_color = tuple(landmarks_color)
+        self.connections_color = tuple(connections_color)
+        self.thickness = thickness
+        self.circle_radius = circle_radius
+        self.border_radius = max(circle_radius + 1, int(circle_radius * 1.2))
+
+    def draw(self, img: np.ndarray, result: 'HandResult') -> np.ndarray:
+        """
+        Draw the hands of a result into img, in place.
+
+        Args:
+            img: BGR image the result was computed on, at any scale
+            result: Detection result with normalized landmarks
+
+        Returns:
+            img
+        """
+        if not len(result.landmarks):
+            return img
+        height, width = img.shape[:2]
+        coordinates = result.landmarks[..., :2]
+        # MediaPipe's _normalized_to_pixel_coordinates: floor, keep [0, 1] only
+        inside = ((coordinates >= 0) & (coordinates <= 1)).all(axis=-1)
+        pixels = np.minimum((coordinates * np.array((width, height), dtype=np.float32)).astype(np.int32),
+                            np.array((width - 1, height - 1), dtype=np.int32))
+        for hand, visible in zip(pixels, inside):
+            connections = HAND_CONNECTIONS
+            if not visible.all():
+                connections = connections[visible[connections].all(axis=1)]
+                hand_points = hand[visible]
+            else:
+                hand_points = hand
+            # Connections first, then points on top, hand by hand
+            if len(connections):
+                cv2.polylines(img, list(hand[connections]), False, self.connections_color, self.thickness)
+            for x, y in hand_points.tolist():
+                cv2.circle(img, (x, y), self.border_radius, _BORDER, self.thickness)
+                cv2.circle(img, (x, y), self.circle_radius, self.landmarks_color, self.thickness)
+        return img
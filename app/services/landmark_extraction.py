@@ -0,0 +1,418 @@
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.services.hand_detection import HandDetector, HandResult, NUM_LANDMARKS
+
+VIDEO_SUFFIXES = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v'}
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+MANIFEST = 'manifest.json'
+
+
+class Source(NamedTuple):
+    """A video file, or a directory of images read as one sequence."""
+    name: str           # output subdirectory
+    path: str
+    kind: str           # 'video' or 'images'
+
+
+class Task(NamedTuple):
+    """A range of frames of one source, processed by one worker."""
+    source: Source
+    start: int
+    stop: Optional[int]  # None reads to the end
+
+
+class Frame(NamedTuple):
+    index: int
+    timestamp: float     # seconds into the video, NaN for images
+    image: np.ndarray    # BGR
+
+
+def find_sources(inputs: Iterable[str]) -> List[Source]:
+    """
+    Expand input paths into the sources to process.
+
+    Video files are sources of their own; directories are searched
+    recursively, and every directory holding images is one image sequence.
+    Sources are named after their path relative to the input they were
+    found under.
+
+    Raises:
+        ValueError: If an input does not exist or two sources get the same name
+    """
+    sources: Dict[str, Source] = {}
+
+    def add(name: str, path: Path, kind: str):
+        name = name.replace(os.sep, '__') or path.name
+        if name in sources:
+            raise ValueError(f"{path} and {sources[name].path} would both be written to {name}")
+        sources[name] = Source(name, str(path), kind)
+
+    for item in map(Path, inputs):
+        if item.is_file():
+            if item.suffix.lower() in VIDEO_SUFFIXES:
+                add(item.stem, item, 'video')
+            elif item.suffix.lower() in IMAGE_SUFFIXES:
+                add(item.parent.name, item.parent, 'images')
+            continue
+        if not item.is_dir():
+            raise ValueError(f"no such file or directory: {item}")
+        for directory, _, files in sorted(os.walk(item)):
+            directory = Path(directory)
+            relative = directory.relative_to(item)
+            prefix = '' if str(relative) == '.' else str(relative)
+            if any(Path(f).suffix.lower() in IMAGE_SUFFIXES for f in files):
+                add(prefix, directory, 'images')
+            for f in sorted(files):
+                if Path(f).suffix.lower() in VIDEO_SUFFIXES:
+                    add(os.path.join(prefix, Path(f).stem), directory / f, 'video')
+    return list(sources.values())
+
+
+def _image_files(directory: str) -> List[str]:
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                  if Path(f).suffix.lower() in IMAGE_SUFFIXES)
+
+
+def count_frames(source: Source) -> int:
+    """
+    Return the number of frames of a source, as reported by its container
+    for videos (0 if unknown).
+    """
+    if source.kind == 'images':
+        return len(_image_files(source.path))
+    capture = cv2.VideoCapture(source.path)
+    try:
+        return max(int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+    finally:
+        capture.release()
+
+
+def plan_tasks(sources: Iterable[Source], segment_frames: int = 0) -> List[Task]:
+    """
+    Split sources into tasks for the worker pool.
+
+    Args:
+        sources: Sources to process
+        segment_frames: Split sources longer than this into ranges of this
+            many frames, so a few long videos still use every core; 0 keeps
+            each source whole. Tracking restarts at every range
+
+    Returns:
+        Tasks, longest sources first
+    """
+    tasks = []
+    for source in sources:
+        total = count_frames(source)
+        starts = list(range(0, total, segment_frames)) if segment_frames and total > segment_frames else [0]
+        for start, stop in zip(starts, starts[1:] + [None]):
+            tasks.append((total, Task(source, start, stop)))
+    tasks.sort(key=lambda item: -item[0])
+    return [task for _, task in tasks]
+
+
+def _open_at(path: str, start: int) -> Optional[cv2.VideoCapture]:
+    """
+    Open a video positioned on frame start exactly.
+
+    Seeking is only trusted when the position reads back as requested,
+    since some backends land on the nearest keyframe instead, which would
+    shift every frame index of a segment. Otherwise the video is reopened
+    and the frames before start are grabbed without being decoded.
+
+    Returns:
+        The capture, or None if the video has no frame start
+    """
+    capture = cv2.VideoCapture(path)
+    if not start:
+        return capture
+    if capture.set(cv2.CAP_PROP_POS_FRAMES, start) and capture.get(cv2.CAP_PROP_POS_FRAMES) == start:
+        return capture
+    capture.release()
+    capture = cv2.VideoCapture(path)
+    for _ in range(start):
+        if not capture.grab():
+            capture.release()
+            return None
+    return capture
+
+
+def read_frames(source: Source, start: int = 0, stop: Optional[int] = None,
+                stride: int = 1) -> Iterator[Frame]:
+    """
+    Stream the frames of a source, one at a time.
+
+    Args:
+        source: Video or image sequence
+        start: Index of the first frame
+        stop: Index past the last frame, None for the end
+        stride: Yield one frame out of every N; skipped video frames are
+            grabbed without being decoded
+
+    Yields:
+        Frame with its index in the source
+    """
+    if source.kind == 'images':
+        files = _image_files(source.path)[start:stop]
+        for offset, path in enumerate(files):
+            index = start + offset
+            if index % stride:
+                continue
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+            if image is not None:
+                yield Frame(index, float('nan'), image)
+        return
+
+    capture = _open_at(source.path, start)
+    if capture is None:
+        return
+    try:
+        index = start
+        while stop is None or index < stop:
+            if index % stride:
+                if not capture.grab():
+                    break
+                index += 1
+                continue
+            ok, image = capture.read()
+            if not ok:
+                break
+            yield Frame(index, capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0, image)
+            index += 1
+    finally:
+        capture.release()
+
+
+def detect_frames(detector: HandDetector, frames: Iterable[Frame]
+                  ) -> Iterator[Tuple[Frame, HandResult]]:
+    """
+    Run the detector over a stream of frames.
+
+    Yields:
+        (frame, HandResult) per frame
+    """
+    for frame in frames:
+        yield frame, detector.find_hands_array(frame.image)
+
+
+def chunk_results(results: Iterable[Tuple[Frame, HandResult]], chunk_frames: int
+                  ) -> Iterator[Tuple[int, Dict[str, np.ndarray]]]:
+    """
+    Group results into columnar chunks covering fixed ranges of frame indices.
+
+    Chunk k covers frames [k * chunk_frames, (k + 1) * chunk_frames), so
+    chunk boundaries do not depend on where processing started.
+
+    Yields:
+        (first frame index of the range, columns) per non-empty chunk
+    """
+    chunk_start = None
+    rows: List[Tuple[Frame, HandResult]] = []
+    for frame, result in results:
+        start = frame.index - frame.index % chunk_frames
+        if rows and start != chunk_start:
+            yield chunk_start, to_columns(rows)
+            rows = []
+        chunk_start = start
+        rows.append((frame, result))
+    if rows:
+        yield chunk_start, to_columns(rows)
+
+
+def to_columns(rows: List[Tuple[Frame, HandResult]]) -> Dict[str, np.ndarray]:
+    """
+    Build the arrays of one chunk.
+
+    Frame columns have one row per frame, hand columns one row per detected
+    hand, linked to its frame by hand_frame.
+    """
+    hands = [(frame.index, result) for frame, result in rows if len(result.landmarks)]
+    if hands:
+        landmarks = np.concatenate([result.landmarks for _, result in hands])
+        handedness = np.concatenate([result.handedness for _, result in hands])
+        scores = np.concatenate([result.scores for _, result in hands])
+        hand_frame = np.concatenate([np.full(len(result.landmarks), index, np.int64)
+                                     for index, result in hands])
+    else:
+        landmarks = np.empty((0, NUM_LANDMARKS, 3), np.float32)
+        handedness = np.empty(0, np.uint8)
+        scores = np.empty(0, np.float32)
+        hand_frame = np.empty(0, np.int64)
+    return {
+        'frame_index': np.array([frame.index for frame, _ in rows], np.int64),
+        'timestamp': np.array([frame.timestamp for frame, _ in rows], np.float64),
+        'n_hands': np.array([len(result.landmarks) for _, result in rows], np.uint8),
+        'image_shape': np.array([result.image_shape for _, result in rows], np.uint16).reshape(-1, 2),
+        'hand_frame': hand_frame,
+        'landmarks': landmarks.astype(np.float32, copy=False),
+        'handedness': handedness.astype(np.uint8, copy=False),
+        'scores': scores.astype(np.float32, copy=False),
+    }
+
+
+def chunk_path(output: str, source: Source, start: int) -> str:
+    return os.path.join(output, source.name, f'frames_{start:09d}.npz')
+
+
+def _segment_marker(output: str, task: Task) -> str:
+    return os.path.join(output, task.source.name, f'segment_{task.start:09d}.done')
+
+
+def _write_atomic(path: str, write: Callable):
+    # Readers and resumed runs never see a partial file.
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def run_task(task: Task, output: str, chunk_frames: int = 1000, stride: int = 1,
+             compress: bool = False, **detector_kwargs) -> Dict:
+    """
+    Extract the landmarks of one task into chunk files, resuming after the
+    chunks already written.
+
+    A finished task leaves a marker next to its chunks and is skipped by
+    later runs; an interrupted one restarts at its first missing chunk.
+
+    Args:
+        task: Frame range to process
+        output: Output directory
+        chunk_frames: Frames per chunk file, also the checkpoint interval
+        stride: Process one frame out of every N
+        compress: Write compressed .npz chunks
+        **detector_kwargs: Forwarded to HandDetector
+
+    Returns:
+        Task summary: source, start, frames, hands, seconds, resumed_from
+    """
+    marker = _segment_marker(output, task)
+    if os.path.exists(marker):
+        with open(marker) as f:
+            return {**json.load(f), 'skipped': True}
+
+    os.makedirs(os.path.join(output, task.source.name), exist_ok=True)
+    start = task.start
+    while (task.stop is None or start < task.stop) and os.path.exists(chunk_path(output, task.source, start)):
+        start += chunk_frames
+
+    begin = time.perf_counter()
+    frames = hands = 0
+    save = np.savez_compressed if compress else np.savez
+    detector = HandDetector(**detector_kwargs)
+    try:
+        results = detect_frames(detector, read_frames(task.source, start, task.stop, stride))
+        for chunk_start, columns in chunk_results(results, chunk_frames):
+            _write_atomic(chunk_path(output, task.source, chunk_start), lambda f: save(f, **columns))
+            frames += len(columns['frame_index'])
+            hands += len(columns['hand_frame'])
+    finally:
+        detector.close()
+
+    summary = {
+        'source': task.source.name,
+        'start': task.start,
+        'resumed_from': start,
+        'frames': frames,
+        'hands': hands,
+        'seconds': time.perf_counter() - begin,
+    }
+    _write_atomic(marker, lambda f: f.write(json.dumps(summary).encode()))
+    return {**summary, 'skipped': False}
+
+
+def _init_worker():
+    # One process per core already; OpenCV's own threads would oversubscribe.
+    cv2.setNumThreads(1)
+
+
+def extract_landmarks(inputs: Iterable[str], output: str, workers: Optional[int] = None,
+                      chunk_frames: int = 1000, segment_frames: int = 0, stride: int = 1,
+                      compress: bool = False, progress: Optional[Callable[[Dict], None]] = None,
+                      **detector_kwargs) -> List[Dict]:
+    """
+    Extract hand landmarks from videos and image sequences on every core.
+
+    Sources are sharded across a process pool, each worker streaming frames
+    through its own detector and writing columnar .npz chunks under
+    output/<source name>/. The run's settings are kept in a manifest, and
+    running again with the same settings resumes where the last run stopped.
+
+    Args:
+        inputs: Video files, image files or directories
+        output: Output directory
+        workers: Worker processes, defaults to the CPU count
+        chunk_frames: Frames per chunk file, also the checkpoint interval
+        segment_frames: Split longer sources into ranges of this many
+            frames, rounded up to whole chunks; 0 keeps sources whole
+        stride: Process one frame out of every N
+        compress: Write compressed .npz chunks
+        progress: Called with the summary of each finished task
+        **detector_kwargs: Forwarded to HandDetector
+
+    Returns:
+        Summaries of every task
+
+    Raises:
+        ValueError: If no video or image is found, or the output holds a
+            run with different settings
+    """
+    if segment_frames:
+        segment_frames = -(-segment_frames // chunk_frames) * chunk_frames
+    settings = {'chunk_frames': chunk_frames, 'segment_frames': segment_frames,
+                'stride': stride, 'detector': detector_kwargs}
+    sources = find_sources(inputs)
+    if not sources:
+        raise ValueError("no videos or images found in the inputs")
+
+    os.makedirs(output, exist_ok=True)
+    manifest_path = os.path.join(output, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if previous['settings'] != settings:
+            raise ValueError(f"{output} holds a run with settings {previous['settings']}, "
+                             f"not {settings}; use another output directory")
+    manifest = {'settings': settings, 'sources': [source._asdict() for source in sources]}
+    _write_atomic(manifest_path, lambda f: f.write(json.dumps(manifest, indent=2).encode()))
+
+    tasks = plan_tasks(sources, segment_frames)
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    summaries = []
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context('spawn'),
+                             initializer=_init_worker) as pool:
+        futures = [pool.submit(run_task, task, output, chunk_frames, stride, compress, **detector_kwargs)
+                   for task in tasks]
+        for future in as_completed(futures):
+            summary = future.result()
+            summaries.append(summary)
+            if progress is not None:
+                progress(summary)
+    return summaries
+
+
+def load_landmarks(output: str, source_name: str) -> Dict[str, np.ndarray]:
+    """
+    Read back every chunk of a source as one set of columns.
+
+    Returns:
+        Columns as written by to_columns(), concatenated in frame order
+    """
+    directory = os.path.join(output, source_name)
+    paths = sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                   if f.startswith('frames_') and f.endswith('.npz'))
+    chunks = []
+    for path in paths:
+        with np.load(path) as data:
+            chunks.append({key: data[key] for key in data.files})
+    if not chunks:
+        return to_columns([])
+    return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
@@ -0,0 +1,80 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+
+def _smoothing_factor(cutoff, dt: float):
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 10.0, d_cutoff: float = 1.0):
+        """
+        One Euro filter over landmark arrays of any shape.
+
+        Slow movements are smoothed heavily (cutoff close to ``min_cutoff``)
+        to remove jitter, fast ones lightly so the filter adds little lag.
+        The filtered velocity is kept so landmarks can be extrapolated for
+        frames where inference is skipped.
+
+        Args:
+            min_cutoff: Minimum cutoff frequency in Hz
+            beta: How fast the cutoff grows with speed (normalized units/s)
+            d_cutoff: Cutoff frequency in Hz for the velocity estimate
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the filter state, e.g. when the tracked hands change.
+        """
+        self.value: Optional[np.ndarray] = None
+        self.velocity: Optional[np.ndarray] = None
+        self.timestamp: Optional[float] = None
+
+    def __call__(self, x: np.ndarray, timestamp: float) -> np.ndarray:
+        """
+        Filter a new measurement.
+
+        Args:
+            x: Measured values, same shape on every call until reset()
+            timestamp: Measurement time in seconds
+
+        Returns:
+            Filtered values
+        """
+        if self.value is None or self.value.shape != x.shape:
+            self.value = x.astype(np.float32, copy=True)
+            self.velocity = np.zeros_like(self.value)
+            self.timestamp = timestamp
+            return self.value.copy()
+
+        dt = timestamp - self.timestamp
+        if dt <= 0:
+            return self.value.copy()
+
+        velocity = (x - self.value) / dt
+        a_d = _smoothing_factor(self.d_cutoff, dt)
+        self.velocity += a_d * (velocity - self.velocity)
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self.velocity)
+        a = _smoothing_factor(cutoff, dt)
+        self.value += a * (x - self.value)
+        self.timestamp = timestamp
+        return self.value.copy()
+
+    def predict(self, timestamp: float) -> Optional[np.ndarray]:
+        """
+        Extrapolate the filtered values to a later time at constant velocity.
+
+        Returns:
+            Predicted values, or None if the filter has no state yet
+        """
+        if self.value is None:
+            return None
+        return self.value + self.velocity * (timestamp - self.timestamp)
@@ -0,0 +1,301 @@
+import hashlib
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from app.services.hand_detection import HandResult, NUM_LANDMARKS
+
+LOG_MAGIC = b'HLOG'
+LOG_VERSION = 1
+LOG_SUFFIX = '.hlog'
+# Longest session ID used as is in a log file name
+_MAX_NAME = 64
+
+# magic, version, max hands per record, record size, padding to 16 bytes
+_HEADER = struct.Struct('<4sHHI4x')
+
+
+def record_dtype(max_hands: int = 2) -> np.dtype:
+    """
+    Return the fixed record layout of a log holding up to max_hands hands
+    per frame. Slots beyond n_hands are zero.
+    """
+    return np.dtype([
+        ('timestamp', '<f8'),
+        ('n_hands', 'u1'),
+        ('height', '<u2'),
+        ('width', '<u2'),
+        ('handedness', 'u1', (max_hands,)),
+        ('scores', '<f4', (max_hands,)),
+        ('landmarks', '<f4', (max_hands, NUM_LANDMARKS, 3)),
+    ])
+
+
+def _read_header(f) -> Tuple[int, np.dtype]:
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError("landmark log too short")
+    magic, version, max_hands, itemsize = _HEADER.unpack(header)
+    if magic != LOG_MAGIC:
+        raise ValueError("not a landmark log")
+    if version != LOG_VERSION:
+        raise ValueError(f"unsupported landmark log version {version}")
+    dtype = record_dtype(max_hands)
+    if dtype.itemsize != itemsize:
+        raise ValueError(f"landmark log records have {itemsize} bytes, expected {dtype.itemsize}")
+    return max_hands, dtype
+
+
+class LandmarkRecorder:
+    def __init__(self, path: str, max_hands: int = 2, flush_every: int = 30):
+        """
+        Append detection results to a landmark log, one fixed-size record
+        per frame.
+
+        Writing a record fills a preallocated buffer and hands it to a
+        buffered file, a few microseconds per frame. An existing log is
+        appended to; a partial record left by a crash is cut off first.
+
+        Args:
+            path: Log file
+            max_hands: Hands kept per frame in a new log; existing logs
+                keep their own
+            flush_every: Records buffered before they are flushed to the
+                file, where readers see them
+
+        Raises:
+            ValueError: If path exists but is not a landmark log
+        """
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'rb') as f:
+                max_hands, self.dtype = _read_header(f)
+            records = (os.path.getsize(path) - _HEADER.size) // self.dtype.itemsize
+            self._file = open(path, 'r+b')
+            self._file.truncate(_HEADER.size + records * self.dtype.itemsize)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            self.dtype = record_dtype(max_hands)
+            self._file = open(path, 'wb')
+            self._file.write(_HEADER.pack(LOG_MAGIC, LOG_VERSION, max_hands, self.dtype.itemsize))
+        self.max_hands = max_hands
+        self.flush_every = flush_every
+        self._record = np.zeros(1, self.dtype)
+        # Byte and field views of the record buffer, looked up once
+        self._bytes = self._record.view(np.uint8)
+        self._fields = {name: self._record[name] for name in self.dtype.names}
+        self._unflushed = 0
+        self._lock = threading.Lock()
+
+    def write(self, result: HandResult, timestamp: Optional[float] = None):
+        """
+        Append one frame's result; hands beyond max_hands are dropped.
+
+        Args:
+            result: Detection result
+            timestamp: Frame time in seconds, defaults to time.time()
+
+        Raises:
+            ValueError: If the recorder is closed
+        """
+        n_hands = min(len(result.landmarks), self.max_hands)
+        with self._lock:
+            if self.closed:
+                raise ValueError("landmark log is closed")
+            self._bytes[:] = 0
+            record = self._fields
+            record['timestamp'][0] = time.time() if timestamp is None else timestamp
+            record['n_hands'][0] = n_hands
+            record['height'][0], record['width'][0] = result.image_shape
+            if n_hands:
+                record['handedness'][0, :n_hands] = result.handedness[:n_hands]
+                record['scores'][0, :n_hands] = result.scores[:n_hands]
+                record['landmarks'][0, :n_hands] = result.landmarks[:n_hands]
+            self._file.write(self._record.data)
+            self._unflushed += 1
+            if self._unflushed >= self.flush_every:
+                self._file.flush()
+                self._unflushed = 0
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self) -> 'LandmarkRecorder':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LandmarkLog:
+    def __init__(self, path: str):
+        """
+        Read a landmark log through a read-only memory map.
+
+        records is a structured array over the file itself, so columns such
+        as records['timestamp'] or records['landmarks'] are views, not
+        copies. Records appended after opening are not seen; a trailing
+        partial record is ignored.
+
+        Raises:
+            ValueError: If path is not a landmark log
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self.max_hands, self.dtype = _read_header(f)
+        count = (os.path.getsize(path) - _HEADER.size) // self.dtype.itemsize
+        if count:
+            self.records = np.memmap(path, self.dtype, mode='r', offset=_HEADER.size, shape=(count,))
+        else:
+            # Empty files cannot be mapped.
+            self.records = np.zeros(0, self.dtype)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def result(self, index: int) -> HandResult:
+        """
+        Return frame index as a HandResult viewing the mapped file.
+        """
+        record = self.records[index]
+        n_hands = int(record['n_hands'])
+        return HandResult(
+            record['landmarks'][:n_hands],
+            record['handedness'][:n_hands],
+            record['scores'][:n_hands],
+            (int(record['height']), int(record['width']))
+        )
+
+    def __iter__(self) -> Iterator[Tuple[float, HandResult]]:
+        for index in range(len(self.records)):
+            yield float(self.records[index]['timestamp']), self.result(index)
+
+
+def replay(log: LandmarkLog, speed: Optional[float] = 1.0) -> Iterator[Tuple[float, HandResult]]:
+    """
+    Yield the frames of a log paced like the recording.
+
+    Args:
+        log: Log to replay
+        speed: Playback rate, 1 for the original timing, 4 for four times
+            faster; None or 0 yields frames as fast as they are consumed
+
+    Yields:
+        (seconds since the first frame, HandResult) per frame
+    """
+    if not len(log):
+        return
+    first = float(log.records[0]['timestamp'])
+    start = time.monotonic()
+    for timestamp, result in log:
+        offset = timestamp - first
+        if speed:
+            delay = start + offset / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        yield offset, result
+
+
+class SessionRecorders:
+    def __init__(self, directory: str, max_hands: int = 2, max_open: int = 64,
+                 idle_timeout: Optional[float] = 60.0):
+        """
+        One landmark log per session under a directory, opened on the
+        session's first frame and closed when it goes away.
+
+        Sessions that never say goodbye, such as HTTP polling clients or
+        batch streams, are closed after idle_timeout seconds without a
+        frame or when more than max_open logs are open, least recently
+        used first. A closed session that sends again appends to its log.
+        Session IDs that are not safe file names, or are longer than 64
+        characters, are cut down and suffixed with a digest of the full ID.
+
+        Args:
+            directory: Directory of the <session>.hlog files
+            max_hands: Hands kept per frame
+            max_open: Most logs open at once
+            idle_timeout: Seconds without a frame after which a log is
+                closed, None keeps it open
+        """
+        self.directory = directory
+        self.max_hands = max_hands
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        # Open recorders and their last use by path, least recently used first
+        self._recorders: 'OrderedDict[str, Tuple[LandmarkRecorder, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, session_id: str) -> str:
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', session_id)[:_MAX_NAME]
+        if name != session_id:
+            # Keeps the name within file system limits and distinct per ID.
+            name += '-' + hashlib.sha1(session_id.encode()).hexdigest()[:16]
+        return os.path.join(self.directory, name + LOG_SUFFIX)
+
+    def record(self, session_id: str, result: HandResult):
+        path = self.path(session_id)
+        while True:
+            recorder = self._recorder(path)
+            try:
+                recorder.write(result)
+                return
+            except ValueError:
+                if not recorder.closed:
+                    raise
+                # Closed as idle or least recently used meanwhile, reopen.
+
+    def _recorder(self, path: str) -> LandmarkRecorder:
+        # Only lookups hold the lock, writes take each recorder's own.
+        # Opening and closing happen under it, so a path is never open
+        # twice and a closed log is complete before it is reopened.
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._recorders.get(path)
+            recorder = entry[0] if entry is not None else LandmarkRecorder(path, self.max_hands)
+            self._recorders[path] = (recorder, now)
+            self._recorders.move_to_end(path)
+            while len(self._recorders) > self.max_open:
+                self._recorders.popitem(last=False)[1][0].close()
+            return recorder
+
+    def _expire(self, now: float):
+        if self.idle_timeout is None:
+            return
+        while self._recorders:
+            path, (recorder, last_used) = next(iter(self._recorders.items()))
+            if now - last_used <= self.idle_timeout:
+                break
+            del self._recorders[path]
+            recorder.close()
+
+    def close(self, session_id: str):
+        with self._lock:
+            entry = self._recorders.pop(self.path(session_id), None)
+            if entry is not None:
+                entry[0].close()
+
+    def close_all(self):
+        with self._lock:
+            for recorder, _ in self._recorders.values():
+                recorder.close()
+            self._recorders.clear()
+
+    def __len__(self) -> int:
+        return len(self._recorders)
@@ -0,0 +1,28 @@
+import importlib
+from types import ModuleType
+
+
+class LazyModules:
+    def __init__(self, **modules: str):
+        """
+        Modules imported on first attribute access instead of at import time.
+
+        Keeps OpenCV, MediaPipe and NumPy out of startup while code using
+        them still reads like module-level imports, e.g.
+        ``lazy.landmark_codec.encode_compact(result)``. The import system
+        serializes concurrent first accesses.
+
+        Args:
+            **modules: Attribute name to dotted module path
+        """
+        self._modules = modules
+
+    def __getattr__(self, name: str) -> ModuleType:
+        try:
+            path = self.__dict__['_modules'][name]
+        except KeyError:
+            raise AttributeError(name) from None
+        module = importlib.import_module(path)
+        # Later lookups find the attribute without coming back here.
+        setattr(self, name, module)
+        return module
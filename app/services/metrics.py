@@ -0,0 +1,202 @@
+import math
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from typing import Dict, List, Mapping, Sequence, Tuple
+
+# Seconds, from sub-millisecond stages up to a stalled request.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Encoded frame sizes in bytes.
+SIZE_BUCKETS = (4096, 8192, 16384, 32768, 65536, 131072, 262144, 524288, 1048576)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ('%s="%s"' % (name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+             for name, value in zip(names, values))
+    return '{' + ','.join(pairs) + '}'
+
+
+class _Metric(ABC):
+    """Named metric with one series per combination of label values."""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines of every series, without the header."""
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + ''.join(line + '\n' for line in self._samples())
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        """
+        Increase the counter of a series.
+
+        Args:
+            *labels: One value per label name, in order
+            amount: Non-negative increment
+        """
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._series.get(labels, 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = list(self._series.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                for labels, value in series]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        """
+        Cumulative histogram in the Prometheus format.
+
+        Observing is a bisect over the bucket bounds and three additions
+        under an uncontended lock, cheap enough for every frame.
+
+        Args:
+            name: Metric name
+            documentation: Help text
+            labelnames: Names of the labels distinguishing series
+            buckets: Upper bounds of the buckets, +Inf is implied
+        """
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        """
+        Record one value.
+
+        Args:
+            value: Observed value, e.g. seconds or bytes
+            *labels: One value per label name, in order
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts (last one is +Inf), sum, count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return series[2] if series is not None else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(counts), total, n) for labels, (counts, total, n) in self._series.items()]
+        names = self.labelnames + ('le',)
+        lines = []
+        for labels, counts, total, n in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} "
+                             f"{cumulative}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {repr(float(total))}")
+            lines.append(f"{self.name}_count{label_text} {n}")
+        return lines
+
+
+class MetricsRegistry:
+    """Set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Return every metric in the Prometheus text exposition format 0.0.4.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return ''.join(metric.render() for metric in metrics)
+
+
+# Process-wide metrics of the detection pipeline, exposed by /metrics.
+registry = MetricsRegistry()
+stage_seconds = registry.histogram(
+    'hand_detect_stage_seconds',
+    'Time spent in each stage of hand detection requests.',
+    ('stage',)
+)
+frame_bytes = registry.histogram(
+    'hand_detect_frame_bytes',
+    'Size of the encoded frames received.',
+    buckets=SIZE_BUCKETS
+)
+hands_detected = registry.histogram(
+    'hand_detect_hands',
+    'Number of hands returned per frame.',
+    buckets=(0, 1, 2, 3, 4)
+)
+detect_errors = registry.counter(
+    'hand_detect_errors_total',
+    'Frames that could not be processed, by reason.',
+    ('reason',)
+)
+rejected_frames = registry.counter(
+    'hand_detect_rejected_total',
+    'Frames dropped by admission control, by reason.',
+    ('reason',)
+)
+
+
+def record_stages(timings: Mapping[str, float]):
+    """
+    Record the stage timings of one frame, as collected by HandTracker.
+
+    Args:
+        timings: Seconds spent per stage name
+    """
+    for stage, seconds in timings.items():
+        stage_seconds.observe(seconds, stage)
@@ -0,0 +1,114 @@
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class MotionGateStats:
+    """Thread-safe hit counters shared by all gates of a process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.hits = 0
+
+    def record(self, hit: bool):
+        with self._lock:
+            self.checks += 1
+            self.hits += hit
+
+    def as_dict(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'checks': self.checks,
+                'hits': self.hits,
+                'hit_rate': self.hits / self.checks if self.checks else 0.0,
+            }
+
+
+# Default counters, exposed by /detect_hand/stats.
+motion_stats = MotionGateStats()
+
+
+class MotionGate:
+    def __init__(self, threshold: float = 10.0, size: Tuple[int, int] = (32, 18),
+                 max_age: float = 5.0, stats: Optional[MotionGateStats] = None):
+        """
+        Cheap scene-change detector run before inference.
+
+        Frames are reduced to a tiny grayscale thumbnail and compared with
+        the thumbnail of the last frame inference ran on, cell by cell.
+        While no cell differs by the threshold or more the scene is
+        considered unchanged and that frame's result can be reused. The
+        largest cell difference is used rather than the mean over the
+        frame, which a hand-sized change barely moves.
+
+        Args:
+            threshold: Absolute difference in gray levels (0-255) of the
+                most changed cell below which the scene is considered
+                static. Each cell averages many pixels, so sensor noise
+                stays well under it
+            size: (width, height) of the thumbnail compared
+            max_age: Seconds after which the model runs anyway
+            stats: Counters to update, the process-wide ones by default
+        """
+        self.threshold = threshold
+        self.size = size
+        self.max_age = max_age
+        self.stats = stats or motion_stats
+        self._reference: Optional[np.ndarray] = None
+        self._reference_time = 0.0
+        # Thumbnail of the last changed frame, until inference runs on it
+        self._candidate: Optional[Tuple[np.ndarray, float]] = None
+
+    def _thumbnail(self, img) -> np.ndarray:
+        # Striding first keeps the resize cost independent of frame size.
+        step = max(1, img.shape[1] // (self.size[0] * 4))
+        small = cv2.resize(img[::step, ::step], self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+    def is_static(self, img, timestamp: Optional[float] = None) -> bool:
+        """
+        Check whether a frame matches the last reference frame.
+
+        When it does not, the frame becomes the reference only once
+        accept() confirms inference ran on it, so frames whose result was
+        extrapolated never stand in for an inferred one.
+
+        Args:
+            img: Input image, BGR or RGB (only differences are measured)
+            timestamp: Frame time in seconds, defaults to time.monotonic()
+
+        Returns:
+            True if the previous result can be reused for this frame
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        thumbnail = self._thumbnail(img)
+        reference = self._reference
+        static = (
+            reference is not None
+            and reference.shape == thumbnail.shape
+            and timestamp - self._reference_time <= self.max_age
+            and int(np.abs(thumbnail - reference).max()) < self.threshold
+        )
+        self._candidate = None if static else (thumbnail, timestamp)
+        self.stats.record(static)
+        return static
+
+    def accept(self):
+        """
+        Make the last frame checked the reference, after inference ran on it.
+        """
+        if self._candidate is not None:
+            self._reference, self._reference_time = self._candidate
+            self._candidate = None
+
+    def reset(self):
+        """
+        Forget the reference frame so the next frame runs inference.
+        """
+        self._reference = None
+        self._candidate = None
@@ -0,0 +1,159 @@
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Tuple
+
+if TYPE_CHECKING:
+    from app.services.hand_detection import HandResult
+
+MJPEG_BOUNDARY = 'frame'
+MJPEG_MIMETYPE = f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}'
+
+
+class PreviewUnavailable(Exception):
+    """The preview viewer limit is reached."""
+
+
+class PreviewHub:
+    def __init__(self, quality: int = 70, max_fps: float = 15.0, decode_scale: int = 2,
+                 max_viewers: int = 4, keepalive: float = 2.0):
+        """
+        Annotated previews of detection sessions, streamed as MJPEG to
+        operators.
+
+        The detection path only hands over the encoded frame it already has
+        and its result, and only for sessions someone is watching; for the
+        others publish() is a dictionary lookup. Decoding, drawing and
+        re-encoding happen on the viewer's own thread, at most max_fps times
+        per second, drawing into the decoded frame itself.
+
+        Args:
+            quality: JPEG quality of the preview, 0-100
+            max_fps: Highest frame rate rendered per viewer
+            decode_scale: Downscale factor applied while decoding, 1, 2, 4 or 8
+            max_viewers: Viewers streaming at once across sessions
+            keepalive: Seconds after which the last frame is sent again when
+                nothing new arrived, so closed viewers are noticed
+        """
+        self.quality = quality
+        self.max_fps = max_fps
+        self.decode_scale = decode_scale
+        self.max_viewers = max_viewers
+        self.keepalive = keepalive
+        self._cond = threading.Condition()
+        # Viewer count per watched session
+        self._viewers: Dict[str, int] = {}
+        # Latest (sequence, encoded frame, result) per watched session
+        self._frames: Dict[str, Tuple[int, bytes, 'HandResult']] = {}
+        self.rendered = 0
+
+    @property
+    def viewers(self) -> int:
+        return sum(self._viewers.values())
+
+    def publish(self, session_id: str, buffer, result: 'HandResult'):
+        """
+        Offer a session's latest frame and result to its viewers, if any.
+
+        Args:
+            session_id: Session the frame belongs to
+            buffer: Encoded frame as uploaded
+            result: Detection result of the frame
+        """
+        if session_id not in self._viewers:
+            return
+        with self._cond:
+            if session_id not in self._viewers:
+                return
+            previous = self._frames.get(session_id)
+            sequence = previous[0] + 1 if previous is not None else 0
+            # Uploads may arrive as views into reused buffers.
+            self._frames[session_id] = (sequence, bytes(buffer), result)
+            self._cond.notify_all()
+
+    def stream(self, session_id: str) -> Iterator[bytes]:
+        """
+        Register a viewer and yield the parts of its MJPEG stream.
+
+        The viewer counts against max_viewers until the generator is closed,
+        which the server does when the client disconnects.
+
+        Raises:
+            PreviewUnavailable: If max_viewers are already streaming
+        """
+        parts = self._stream(session_id)
+        # Run up to the first yield, so the viewer is registered or refused
+        # now and closing the response, even unread, unregisters it.
+        next(parts)
+        return parts
+
+    def _stream(self, session_id: str) -> Iterator[bytes]:
+        from app.services.frame_ingest import FrameIngest
+        from app.services.landmark_drawing import LandmarkPainter
+
+        with self._cond:
+            if self.viewers >= self.max_viewers:
+                raise PreviewUnavailable(f"at most {self.max_viewers} preview viewers")
+            self._viewers[session_id] = self._viewers.get(session_id, 0) + 1
+        ingest = FrameIngest(self.decode_scale)
+        painter = LandmarkPainter()
+        interval = 1.0 / self.max_fps
+        seen = -1
+        part = None
+        try:
+            yield b''
+            while True:
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: self._frames.get(session_id, (seen,))[0] != seen,
+                        self.keepalive
+                    )
+                    latest = self._frames.get(session_id)
+                started = time.monotonic()
+                if latest is not None and latest[0] != seen:
+                    seen, buffer, result = latest
+                    jpeg = self.render(buffer, result, ingest, painter)
+                    if jpeg is not None:
+                        part = (f'--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                                f'Content-Length: {len(jpeg)}\r\n\r\n').encode() + jpeg + b'\r\n'
+                if part is not None:
+                    yield part
+                else:
+                    # Nothing to show yet. Preamble padding, ignored by
+                    # clients, lets the server notice a viewer that left.
+                    yield b'\r\n'
+                delay = interval - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+        finally:
+            with self._cond:
+                self._viewers[session_id] -= 1
+                if not self._viewers[session_id]:
+                    del self._viewers[session_id]
+                    self._frames.pop(session_id, None)
+
+    def render(self, buffer, result: 'HandResult', ingest, painter) -> Optional[bytes]:
+        """
+        Decode a frame, draw its hands in place and encode it as JPEG.
+
+        Returns:
+            JPEG bytes, or None if the frame cannot be decoded
+        """
+        import cv2
+
+        img = ingest.decode_bgr(buffer)
+        if img is None:
+            return None
+        painter.draw(img, result)
+        ok, jpeg = cv2.imencode('.jpg', img, (cv2.IMWRITE_JPEG_QUALITY, self.quality))
+        if not ok:
+            return None
+        self.rendered += 1
+        return jpeg.tobytes()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'viewers': self.viewers,
+                'sessions': len(self._viewers),
+                'rendered': self.rendered,
+            }
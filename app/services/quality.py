@@ -0,0 +1,182 @@
+import math
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class QualityLevel(NamedTuple):
+    """Detector settings of one quality step."""
+    model_complexity: int  # 0 lite, 1 full landmark model
+    decode_scale: int      # 1, 2, 4 or 8
+    max_num_hands: int
+
+
+def quality_levels(model_complexity: int = 1, decode_scale: int = 1, max_num_hands: int = 2,
+                   max_decode_scale: int = 4) -> List[QualityLevel]:
+    """
+    Build the quality steps from the configured settings down to the cheapest.
+
+    Steps give up the least accuracy first: the lite landmark model, then
+    coarser decoding, then tracking a single hand.
+
+    Args:
+        model_complexity: Configured model complexity, the best level
+        decode_scale: Configured decode scale, the best level
+        max_num_hands: Configured maximum number of hands, the best level
+        max_decode_scale: Coarsest decode scale allowed
+
+    Returns:
+        Levels ordered from best to cheapest
+    """
+    levels = [QualityLevel(model_complexity, decode_scale, max_num_hands)]
+    if model_complexity > 0:
+        levels.append(QualityLevel(0, decode_scale, max_num_hands))
+    scale = decode_scale
+    while scale * 2 <= max_decode_scale:
+        scale *= 2
+        levels.append(QualityLevel(0, scale, max_num_hands))
+    if max_num_hands > 1:
+        levels.append(QualityLevel(0, scale, 1))
+    return levels
+
+
+class InferenceLoad:
+    """Thread-safe count of the inferences running in this process."""
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self.active = 0
+        # Inference worker processes run one frame at a time and cannot see
+        # each other, so their count says nothing and they turn it off.
+        self.enabled = True
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """
+        Count an inference as running for the duration of the block.
+        """
+        with self._lock:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    @property
+    def utilization(self) -> float:
+        """Running inferences per CPU; above 1 they compete for cores. 0 when disabled."""
+        if not self.enabled:
+            return 0.0
+        return self.active / self.capacity
+
+
+# Shared by every tracker of the process.
+inference_load = InferenceLoad()
+
+
+class QualityController:
+    def __init__(self, target: float, levels: Sequence[QualityLevel],
+                 load: Optional[InferenceLoad] = None, headroom: float = 0.6,
+                 max_load: float = 1.0, min_samples: int = 5, cooldown: float = 3.0,
+                 smoothing: float = 0.3, recheck: float = 30.0):
+        """
+        Step a session between quality levels to keep inference within a
+        latency target.
+
+        Latency is averaged over the frames of the current level, and the
+        last average of every level left is remembered. A level is dropped
+        as soon as the average exceeds the target or the process is
+        overloaded. The better level is regained only when the latency last
+        measured there, not the one of the cheaper current level, was well
+        under the target, the load is low and the current level has been
+        held for a while, so the controller does not oscillate. A remembered
+        latency older than recheck seconds is retried once the current one
+        leaves as much headroom.
+
+        Args:
+            target: Seconds of decode plus inference allowed per frame
+            levels: Quality levels ordered from best to cheapest
+            load: Process load to watch, the shared inference_load by default
+            headroom: Fraction of the target (and of max_load) the average
+                must stay under before stepping back up
+            max_load: Utilization above which quality is lowered regardless
+                of latency
+            min_samples: Frames measured at a level before deciding
+            cooldown: Seconds a level is held before stepping back up
+            smoothing: Weight of the newest frame in the latency average
+            recheck: Seconds after which a level's remembered latency is
+                no longer trusted
+        """
+        if not levels:
+            raise ValueError("at least one quality level is required")
+        self.target = target
+        self.levels = list(levels)
+        self.load = load or inference_load
+        self.headroom = headroom
+        self.max_load = max_load
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.recheck = recheck
+        self.index = 0
+        self.latency: Optional[float] = None
+        self._samples = 0
+        self._changed_at = -math.inf
+        # (average latency, time it was measured) per level index
+        self._level_latency: Dict[int, Tuple[float, float]] = {}
+
+    @property
+    def level(self) -> QualityLevel:
+        return self.levels[self.index]
+
+    def update(self, latency: float, timestamp: float) -> Optional[QualityLevel]:
+        """
+        Record the latency of one processed frame.
+
+        Args:
+            latency: Seconds spent decoding and running inference
+            timestamp: Frame time in seconds
+
+        Returns:
+            The level to switch to, or None to keep the current one
+        """
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        self._samples += 1
+        if self._samples < self.min_samples:
+            return None
+
+        load = self.load.utilization
+        if self.latency > self.target or load > self.max_load:
+            step = 1
+        elif (self.index > 0 and self._better_fits(timestamp)
+              and load <= self.max_load * self.headroom
+              and timestamp - self._changed_at >= self.cooldown):
+            step = -1
+        else:
+            return None
+
+        index = min(max(self.index + step, 0), len(self.levels) - 1)
+        if index == self.index:
+            return None
+        self._level_latency[self.index] = (self.latency, timestamp)
+        self.index = index
+        self.latency = None
+        self._samples = 0
+        self._changed_at = timestamp
+        return self.level
+
+    def _better_fits(self, timestamp: float) -> bool:
+        # Latency at the current, cheaper level says little about the
+        # better one, so what was measured there decides.
+        known = self._level_latency.get(self.index - 1)
+        if known is None or timestamp - known[1] > self.recheck:
+            latency = self.latency
+        else:
+            latency = known[0]
+        return latency < self.target * self.headroom
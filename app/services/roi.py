@@ -0,0 +1,83 @@
+from typing import NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class RegionOfInterest(NamedTuple):
+    """Pixel crop of a frame, end coordinates exclusive."""
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+
+    @property
+    def width(self) -> int:
+        return self.x1 - self.x0
+
+    @property
+    def height(self) -> int:
+        return self.y1 - self.y0
+
+    def crop(self, img) -> np.ndarray:
+        """
+        Return the region as a view of the image, without copying.
+        """
+        return img[self.y0:self.y1, self.x0:self.x1]
+
+
+def hands_roi(landmarks: np.ndarray, image_shape: Tuple[int, int],
+              margin: float = 0.5, min_size: int = 128) -> Optional[RegionOfInterest]:
+    """
+    Compute one crop around all hands, padded so they stay inside it on the
+    next frame.
+
+    Args:
+        landmarks: (n_hands, 21, 3) array of normalized coordinates
+        image_shape: Tuple of (height, width)
+        margin: Padding added on each side, as a fraction of the hands'
+            bounding box size
+        min_size: Minimum crop width and height in pixels
+
+    Returns:
+        RegionOfInterest clipped to the frame, or None if there are no hands
+    """
+    if not len(landmarks):
+        return None
+    height, width = image_shape
+    points = landmarks[..., :2].reshape(-1, 2) * np.array((width, height), dtype=np.float32)
+    low = points.min(axis=0)
+    high = points.max(axis=0)
+    center = (low + high) / 2
+    # Square crop: hands rotate, and MediaPipe letterboxes to a square anyway.
+    size = max(float((high - low).max()) * (1 + 2 * margin), min_size)
+    half = size / 2
+
+    x0 = int(max(0, center[0] - half))
+    y0 = int(max(0, center[1] - half))
+    x1 = int(min(width, center[0] + half))
+    y1 = int(min(height, center[1] + half))
+    if x1 - x0 < 2 or y1 - y0 < 2:
+        return None
+    return RegionOfInterest(x0, y0, x1, y1)
+
+
+def roi_to_frame(landmarks: np.ndarray, roi: RegionOfInterest,
+                 image_shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Map landmarks detected in a crop back to full-frame normalized coordinates.
+
+    MediaPipe's z uses the same scale as x, so it is rescaled with the
+    crop width.
+
+    Args:
+        landmarks: (n_hands, 21, 3) coordinates normalized to the crop
+        roi: Region the landmarks were detected in
+        image_shape: Tuple of (height, width) of the full frame
+
+    Returns:
+        (n_hands, 21, 3) float32 coordinates normalized to the full frame
+    """
+    height, width = image_shape
+    scale = np.array((roi.width / width, roi.height / height, roi.width / width), dtype=np.float32)
+    offset = np.array((roi.x0 / width, roi.y0 / height, 0.0), dtype=np.float32)
+    return landmarks * scale + offset
@@ -1,39 +1,42 @@
+import sys
+
 import cv2
+from capture import CaptureSource, parse_source
 from hand_detection import HandDetector
 
-cap = cv2.VideoCapture(1)  # Use 0 if this is your primary camera
+# Use 0 if this is your primary camera, or pass a video file
+source = parse_source(sys.argv[1]) if len(sys.argv) > 1 else 1
 want_to_draw = True
 
 def hand_detection():
     # Initialize detector
     detector = HandDetector()
+    # Frames are read on a background thread; slow detection drops stale
+    # frames instead of letting them queue up
+    cap = CaptureSource(source)
 
     # Basic usage (just get coordinates)
     while True:
-        success, img = cap.read()
-        if not success:
+        frame = cap.read()
+        if frame is None:
             break
+        img = frame.image
             
-        # Get hand detection results
-        detection_results = detector.find_hands(img)
+        # Get hand detection results as arrays
+        result = detector.find_hands_array(img)
         
-        if detection_results['coordinates']:
-            # Get coordinates and hand types
-            for idx, hand_coords in enumerate(detection_results['coordinates']):
-                hand_type = detection_results['hand_types'][idx]
-                
-                # Convert to pixel coordinates if needed
-                pixel_coords = detector.get_pixel_coordinates(
-                    hand_coords, 
-                    detection_results['image_shape']
-                )
-                
-                # Use the coordinates as needed
-                print(f"{hand_type} Hand coordinates:", pixel_coords)
+        if len(result.landmarks):
+            # Convert every hand to pixel coordinates in one vectorized step
+            pixel_coords = detector.to_pixels(result.landmarks, result.image_shape)
+            boxes = detector.bounding_boxes(result.landmarks, result.image_shape)
+            
+            # Use the coordinates as needed
+            for hand_type, hand_pixels, box in zip(result.hand_types, pixel_coords, boxes):
+                print(f"{hand_type or 'Unknown'} Hand coordinates:", hand_pixels, "box:", box)
         
         # Optionally draw the hands
         if want_to_draw:
-            img_with_drawings = detector.draw_hands(img, detection_results)
+            img_with_drawings = detector.draw_hands(img, result)
             cv2.imshow("Image", img_with_drawings)
         else:
             cv2.imshow("Image", img)
@@ -41,7 +44,8 @@ def hand_detection():
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
-    cap.release()
+    print(cap.stats())
+    cap.close()
     cv2.destroyAllWindows()
 
 if __name__ == '__main__':
@@ -5,7 +5,16 @@ document.addEventListener('DOMContentLoaded', () => {
     let stream = null;
     let mediaRecorder = null;
     let chunks = [];
-    let frameInterval = null;
+    let polling = false;
+    let socket = null;
+    // Lets the server keep a warm hand tracker for this page.
+    const sessionId = (window.crypto && crypto.randomUUID)
+        ? crypto.randomUUID()
+        : Math.random().toString(36).slice(2) + Date.now().toString(36);
+    // Shared with game.js so the server game follows this page's hands.
+    window.handSessionId = sessionId;
+    // Logging every result slows the page down, so only with ?debug.
+    const debug = new URLSearchParams(location.search).has('debug');
 
     async function startCamera() {
         try {
@@ -26,11 +35,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 chunks.push(event.data);
             };
 
-            frameInterval = setInterval(() => {
-                if (stream) {
-                    sendFrame();
-                }
-            }, 500);
+            openStream();
             
         } catch (err) {
             console.error('Error accessing camera:', err);
@@ -45,29 +50,143 @@ document.addEventListener('DOMContentLoaded', () => {
             startButton.disabled = false;
             stopButton.disabled = true;
         }
-        if (frameInterval) {
-            clearInterval(frameInterval);
-            frameInterval = null;
+        polling = false;
+        if (socket) {
+            socket.close();
+            socket = null;
         }
     }
 
-    function sendFrame() {
-        const canvas = document.createElement('canvas');
+    // Stream frames over one WebSocket: the next frame is sent as soon as
+    // the previous result arrives, so the rate follows server throughput.
+    function openStream() {
+        if (!('WebSocket' in window)) {
+            startPolling();
+            return;
+        }
+        const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+        const ws = new WebSocket(
+            `${scheme}://${location.host}/ws/detect_hand?format=compact&session=${encodeURIComponent(sessionId)}`);
+        ws.binaryType = 'arraybuffer';
+        let opened = false;
+
+        ws.onopen = () => {
+            opened = true;
+            streamFrame(ws);
+        };
+        ws.onmessage = (event) => {
+            // Results arrive binary, errors and skipped frames as JSON text.
+            const data = typeof event.data === 'string'
+                ? JSON.parse(event.data)
+                : decodeLandmarks(event.data);
+            if (debug && !data.skipped) {
+                console.log('Server response:', data);
+            }
+            requestAnimationFrame(() => streamFrame(ws));
+        };
+        ws.onclose = () => {
+            if (socket === ws) {
+                socket = null;
+                // Fall back to HTTP if streaming is unavailable or drops.
+                if (stream) {
+                    startPolling();
+                }
+            }
+        };
+        ws.onerror = (error) => {
+            if (opened) {
+                console.error('Stream error:', error);
+            }
+        };
+        socket = ws;
+    }
+
+    function streamFrame(ws) {
+        if (!stream || ws.readyState !== WebSocket.OPEN) {
+            return;
+        }
+        captureFrame((blob) => {
+            if (blob) {
+                ws.send(blob);
+            } else {
+                // Video not ready yet, try again on the next frame.
+                requestAnimationFrame(() => streamFrame(ws));
+            }
+        });
+    }
+
+    // HTTP fallback: like the stream, one frame in flight at a time, and
+    // the next one is only captured once the previous request completed.
+    function startPolling() {
+        if (polling) {
+            return;
+        }
+        polling = true;
+        pollFrame();
+    }
+
+    function pollFrame() {
+        if (!polling || !stream) {
+            polling = false;
+            return;
+        }
+        sendFrame().then((delay) => setTimeout(pollFrame, delay));
+    }
+
+    // Reused across frames instead of allocating a canvas per request.
+    const canvas = document.createElement('canvas');
+    const ctx = canvas.getContext('2d');
+    // Compressed uploads are several times smaller than base64 PNG in JSON,
+    // and JPEG decodes faster than PNG or WebP on the server.
+    const frameType = 'image/jpeg';
+    const frameQuality = 0.8;
+
+    function captureFrame(callback) {
         canvas.width = video.videoWidth;
         canvas.height = video.videoHeight;
-        const ctx = canvas.getContext('2d');
         ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
 
-        const frameData = canvas.toDataURL('image/png');
+        canvas.toBlob(callback, frameType, frameQuality);
+    }
 
-        fetch('/detect_hand', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ frame: frameData })
-        })
-        .then(response => response.json())
-        .then(data => console.log('Server response:', data))
-        .catch(error => console.error('Error sending frame:', error));
+    // Resolves with the delay in ms before the next frame may be sent.
+    function sendFrame() {
+        return new Promise((resolve) => captureFrame(resolve))
+            .then((blob) => {
+                if (!blob) {
+                    // Video not ready yet.
+                    return 100;
+                }
+                return fetch('/detect_hand?format=compact', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': blob.type,
+                        'X-Session-ID': sessionId
+                    },
+                    body: blob
+                })
+                .then(response => {
+                    if (response.status === 429) {
+                        // Server busy: back off as asked instead of queueing.
+                        const retryAfter = Number(response.headers.get('Retry-After'));
+                        return retryAfter ? retryAfter * 1000 : 0;
+                    }
+                    const type = response.headers.get('Content-Type') || '';
+                    const body = type.startsWith('application/x-hand-landmarks')
+                        ? response.arrayBuffer().then(decodeLandmarks)
+                        : response.json();
+                    return body.then(data => {
+                        if (debug) {
+                            console.log('Server response:', data);
+                        }
+                        return 0;
+                    });
+                });
+            })
+            .catch(error => {
+                console.error('Error sending frame:', error);
+                return 1000;
+            });
     }
 
     startButton.addEventListener('click', startCamera);
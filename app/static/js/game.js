@@ -0,0 +1,103 @@
+// Client for the server-authoritative balloon game (/ws/globos).
+// The server ticks the game and streams state; this only renders it.
+const MSG_SNAPSHOT = 1;
+const MSG_DELTA = 2;
+const MSG_END = 3;
+const BALLOON_RECORD_SIZE = 8;
+const BALLOON_COLORS = ['Rojo', 'Azul', 'Amarillo', 'Rosa', 'Verde'];
+
+document.addEventListener('DOMContentLoaded', () => {
+    const canvas = document.getElementById('gameCanvas');
+    const scoreBoard = document.getElementById('gameScore');
+    const startButton = document.getElementById('startGame');
+    const ctx = canvas.getContext('2d');
+    const sprites = BALLOON_COLORS.map((_, i) => {
+        const img = new Image();
+        img.src = `/static/img/balloons/${i + 1}.png`;
+        return img;
+    });
+
+    let socket = null;
+    let game = null;
+    let balloons = [];
+    let captured = [];
+    let remainingMs = 0;
+
+    function startGame() {
+        if (socket) {
+            socket.close();
+        }
+        const scheme = location.protocol === 'https:' ? 'wss' : 'ws';
+        const session = encodeURIComponent(window.handSessionId || '');
+        const ws = new WebSocket(`${scheme}://${location.host}/ws/globos?session=${session}`);
+        ws.binaryType = 'arraybuffer';
+        ws.onmessage = (event) => {
+            if (typeof event.data === 'string') {
+                game = JSON.parse(event.data);
+                canvas.width = game.area[0];
+                canvas.height = game.area[1];
+                balloons = [];
+                return;
+            }
+            applyState(event.data);
+        };
+        ws.onclose = () => {
+            if (socket === ws) {
+                socket = null;
+            }
+        };
+        socket = ws;
+        requestAnimationFrame(render);
+    }
+
+    // Snapshots and deltas share a layout; records carry absolute values.
+    function applyState(buffer) {
+        const view = new DataView(buffer);
+        const type = view.getUint8(0);
+        remainingMs = view.getUint32(5, true);
+        const spriteCount = view.getUint8(9);
+        const recordCount = view.getUint16(10, true);
+        let offset = 12;
+        captured = [];
+        for (let i = 0; i < spriteCount; i++) {
+            captured.push(view.getUint16(offset, true));
+            offset += 2;
+        }
+        for (let i = 0; i < recordCount; i++) {
+            const index = view.getUint16(offset, true);
+            balloons[index] = {
+                x: view.getUint16(offset + 2, true),
+                y: view.getUint16(offset + 4, true),
+                sprite: view.getUint8(offset + 6),
+                visible: view.getUint8(offset + 7) === 1
+            };
+            offset += BALLOON_RECORD_SIZE;
+        }
+        if (type === MSG_END) {
+            remainingMs = 0;
+        }
+    }
+
+    // Rendering runs at display rate, independent of the server tick rate.
+    function render() {
+        ctx.clearRect(0, 0, canvas.width, canvas.height);
+        if (game) {
+            const [width, height] = game.balloon_size;
+            balloons.forEach((balloon) => {
+                if (balloon && balloon.visible) {
+                    ctx.drawImage(sprites[balloon.sprite % sprites.length],
+                                  balloon.x, balloon.y, width, height);
+                }
+            });
+            const seconds = Math.ceil(remainingMs / 1000);
+            scoreBoard.textContent = `${seconds}s | ` + captured
+                .map((count, i) => `${BALLOON_COLORS[i] || i + 1}: ${count}`)
+                .join(' | ');
+        }
+        if (socket) {
+            requestAnimationFrame(render);
+        }
+    }
+
+    startButton.addEventListener('click', startGame);
+});
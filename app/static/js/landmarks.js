@@ -0,0 +1,65 @@
+// Decoder for the compact binary landmark format
+// (application/x-hand-landmarks, see app/services/landmark_codec.py).
+const LANDMARK_FORMAT_VERSION = 2;
+const LANDMARKS_PER_HAND = 21;
+// Any other handedness index means MediaPipe did not classify the hand.
+const HAND_TYPES = ['Left', 'Right'];
+const QUANT_LOW = -0.5;
+const QUANT_HIGH = 1.5;
+const FINGER_NAMES = ['thumb', 'index', 'middle', 'ring', 'pinky'];
+const CLOSED_BIT = 5;
+const PINCH_SCALE = 1000;
+
+function decodeLandmarks(buffer) {
+    const view = new DataView(buffer);
+    const version = view.getUint8(0);
+    if (version !== LANDMARK_FORMAT_VERSION) {
+        throw new Error(`Unsupported landmark format version ${version}`);
+    }
+    const handCount = view.getUint8(1);
+    const width = view.getUint16(2, true);
+    const height = view.getUint16(4, true);
+    const valuesPerHand = LANDMARKS_PER_HAND * 3;
+    const step = (QUANT_HIGH - QUANT_LOW) / 65535;
+
+    // Gestures follow the landmarks of all hands: flags, pinch, palm center.
+    const gestureOffset = 6 + 2 * handCount + handCount * valuesPerHand * 2;
+    const pinchOffset = gestureOffset + handCount;
+    const palmOffset = pinchOffset + 2 * handCount;
+
+    const hands = [];
+    let offset = 6 + 2 * handCount;
+    for (let i = 0; i < handCount; i++) {
+        // Flat [x0, y0, z0, x1, ...] normalized coordinates
+        const landmarks = new Float32Array(valuesPerHand);
+        for (let j = 0; j < valuesPerHand; j++) {
+            landmarks[j] = view.getUint16(offset, true) * step + QUANT_LOW;
+            offset += 2;
+        }
+        hands.push({
+            handType: HAND_TYPES[view.getUint8(6 + i)] || null,
+            score: view.getUint8(6 + handCount + i) / 255,
+            landmarks: landmarks,
+            gestures: decodeGestures(view, i, gestureOffset, pinchOffset, palmOffset, step)
+        });
+    }
+    return { width: width, height: height, hands: hands };
+}
+
+// Same fields as the gestures of the JSON response.
+function decodeGestures(view, hand, gestureOffset, pinchOffset, palmOffset, step) {
+    const flags = view.getUint8(gestureOffset + hand);
+    const extended = {};
+    FINGER_NAMES.forEach((name, bit) => {
+        extended[name] = (flags & (1 << bit)) !== 0;
+    });
+    return {
+        closed: (flags & (1 << CLOSED_BIT)) !== 0,
+        pinch: view.getUint16(pinchOffset + 2 * hand, true) / PINCH_SCALE,
+        extended: extended,
+        palm_center: [
+            view.getUint16(palmOffset + 4 * hand, true) * step + QUANT_LOW,
+            view.getUint16(palmOffset + 4 * hand + 2, true) * step + QUANT_LOW
+        ]
+    };
+}
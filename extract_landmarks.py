@@ -0,0 +1,63 @@
+"""
+Extract hand landmarks from recorded videos and image sequences, headless,
+on every core. See app/services/landmark_extraction.py for the output.
+
+    python extract_landmarks.py recordings/ session.mp4 -o landmarks/
+
+Each video file, and each directory of images, is one source written to
+landmarks/<source>/ as columnar .npz chunks (frame_index, timestamp,
+n_hands, image_shape, and per hand hand_frame, landmarks, handedness,
+scores). Running the same command again resumes an interrupted run.
+"""
+import argparse
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='video files, images or directories')
+    parser.add_argument('-o', '--output', required=True, help='output directory')
+    parser.add_argument('--workers', type=int, default=None, help='processes, CPU count by default')
+    parser.add_argument('--chunk-frames', type=int, default=1000,
+                        help='frames per chunk file, also the checkpoint interval')
+    parser.add_argument('--segment-frames', type=int, default=0,
+                        help='split longer sources into ranges of this many frames, '
+                             'processed in parallel (tracking restarts at each range)')
+    parser.add_argument('--stride', type=int, default=1, help='process one frame out of every N')
+    parser.add_argument('--compress', action='store_true', help='write compressed chunks')
+    parser.add_argument('--static', action='store_true',
+                        help='detect every frame independently instead of tracking')
+    parser.add_argument('--model-complexity', type=int, default=1, choices=(0, 1))
+    parser.add_argument('--max-num-hands', type=int, default=2)
+    args = parser.parse_args()
+
+    from app.services.landmark_extraction import extract_landmarks
+
+    def progress(summary):
+        state = 'already done' if summary['skipped'] else '%.1f s' % summary['seconds']
+        print('%s @%d: %d frames, %d hands (%s)' % (summary['source'], summary['start'],
+                                                    summary['frames'], summary['hands'], state),
+              flush=True)
+
+    try:
+        summaries = extract_landmarks(
+            args.inputs, args.output,
+            workers=args.workers,
+            chunk_frames=args.chunk_frames,
+            segment_frames=args.segment_frames,
+            stride=args.stride,
+            compress=args.compress,
+            progress=progress,
+            static_image_mode=args.static,
+            model_complexity=args.model_complexity,
+            max_num_hands=args.max_num_hands
+        )
+    except ValueError as e:
+        sys.exit(f'error: {e}')
+    print('%d tasks, %d frames, %d hands' % (len(summaries), sum(s['frames'] for s in summaries),
+                                            sum(s['hands'] for s in summaries)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+Production server: the detection API runs on an event loop (ASGI) with
+inference offloaded to a bounded thread pool, see app/asgi.py.
+
+    python serve.py --host 0.0.0.0 --port 8000
+
+Configuration comes from FLASK_* environment variables, as with run.py.
+Keep a single server process: detectors and games live in memory per
+session, so use FLASK_HAND_INFERENCE_WORKERS to spread inference over
+more CPUs instead.
+"""
+import argparse
+
+import uvicorn
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--log-level', default='info')
+    args = parser.parse_args()
+
+    uvicorn.run(
+        'app.asgi:create_asgi_app',
+        factory=True,
+        host=args.host,
+        port=args.port,
+        ws='wsproto',
+        log_level=args.log_level
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+"""
+Micro-benchmarks of the /detect_hand pipeline, stage by stage.
+
+Every stage is timed on its own (p50/p95/p99 in milliseconds) and then run
+again under tracemalloc to report Python-heap allocations per call. Results
+are written as JSON so runs on different commits can be compared:
+
+    python test/benchmark.py --output before.json
+    python test/benchmark.py --output after.json --compare before.json
+
+Frames are synthetic by default; --frames takes a directory of images or a
+video file to benchmark recorded frames too. Everything runs offline on the
+CPU: MediaPipe ships its models in the wheel and OpenCL is disabled.
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from mediapipe.framework.formats import classification_pb2, landmark_pb2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app.routes.hand_api import result_to_json
+from app.services.frame_ingest import FrameIngest
+from app.services.hand_detection import HandDetector, HAND_TYPES, NUM_LANDMARKS
+from app.services.landmark_codec import encode_compact
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+PERCENTILES = (50, 95, 99)
+
+
+# Generación de frames
+
+def synthetic_frames(sizes, count, seed=0):
+    """
+    Frames with gradients, noise and skin-toned blobs, so JPEG sizes and
+    decode times resemble camera frames rather than flat images.
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(count):
+        width, height = sizes[i % len(sizes)]
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[..., 0] = (x * 0.6 + y * 0.2) % 256
+        frame[..., 1] = (y * 0.7 + i * 10) % 256
+        frame[..., 2] = (x * 0.3 + y * 0.5) % 256
+        frame = cv2.add(frame, rng.integers(0, 24, frame.shape, dtype=np.uint8))
+        for _ in range(3):
+            center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+            axes = (int(rng.integers(30, 120)), int(rng.integers(40, 160)))
+            cv2.ellipse(frame, center, axes, float(rng.integers(0, 180)), 0, 360,
+                        (120, 160, 210), -1)
+        frames.append(frame)
+    return frames
+
+
+def recorded_frames(path, limit):
+    """
+    Read up to `limit` BGR frames from a directory of images or a video file.
+    """
+    frames = []
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                img = cv2.imread(os.path.join(path, name))
+                if img is not None:
+                    frames.append(img)
+            if len(frames) >= limit:
+                break
+    else:
+        capture = cv2.VideoCapture(path)
+        while len(frames) < limit:
+            ok, img = capture.read()
+            if not ok:
+                break
+            frames.append(img)
+        capture.release()
+    if not frames:
+        raise SystemExit(f"No se pudieron leer frames de {path}")
+    return frames
+
+
+def synthetic_results(n_hands, seed=0):
+    """
+    Object shaped like the output of Hands.process, with n_hands hands, so
+    extraction and serialization are measured with hands present even on
+    frames where MediaPipe finds none.
+    """
+    rng = np.random.default_rng(seed)
+    hands, handedness = [], []
+    for i in range(n_hands):
+        landmark_list = landmark_pb2.NormalizedLandmarkList()
+        points = rng.uniform(0.2, 0.8, (NUM_LANDMARKS, 3))
+        points[:, 2] -= 0.5
+        for x, y, z in points:
+            landmark = landmark_list.landmark.add()
+            landmark.x, landmark.y, landmark.z = x, y, z
+        hands.append(landmark_list)
+        classification_list = classification_pb2.ClassificationList()
+        classification = classification_list.classification.add()
+        classification.label = HAND_TYPES[i % 2]
+        classification.score = 0.95
+        handedness.append(classification_list)
+    return types.SimpleNamespace(multi_hand_landmarks=hands, multi_handedness=handedness)
+
+
+# Medición
+
+def time_stage(fn, inputs, repeat, warmup):
+    """
+    Call fn over the inputs, cycling, and return per-call times in ms.
+    """
+    for i in range(warmup):
+        fn(inputs[i % len(inputs)])
+    times = np.empty(repeat, dtype=np.float64)
+    for i in range(repeat):
+        item = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        fn(item)
+        times[i] = time.perf_counter() - start
+    return times * 1000
+
+
+def measure_allocations(fn, inputs, calls):
+    """
+    Python-heap allocations of fn per call, as seen by tracemalloc.
+
+    NumPy and OpenCV arrays are tracked; memory allocated inside native
+    libraries (e.g. the MediaPipe graph) is not.
+    """
+    peaks = np.empty(calls, dtype=np.int64)
+    tracemalloc.start()
+    try:
+        fn(inputs[0])
+        baseline = tracemalloc.get_traced_memory()[0]
+        for i in range(calls):
+            before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn(inputs[i % len(inputs)])
+            peaks[i] = tracemalloc.get_traced_memory()[1] - before
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        tracemalloc.stop()
+    return {
+        "peak_bytes_p50": int(np.median(peaks)),
+        "peak_bytes_max": int(peaks.max()),
+        "retained_bytes": int(retained)
+    }
+
+
+def summarize(times):
+    stats = {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(times, PERCENTILES))}
+    stats.update(
+        n=len(times),
+        mean=float(times.mean()),
+        min=float(times.min()),
+        max=float(times.max())
+    )
+    return stats
+
+
+# Etapas del pipeline
+
+def build_stages(frames, args):
+    """
+    Return (name, function, inputs, repeat) for every stage, in pipeline order.
+    """
+    params = [cv2.IMWRITE_JPEG_QUALITY, args.jpeg_quality]
+    encoded = [cv2.imencode('.jpg', frame, params)[1].tobytes() for frame in frames]
+    data_urls = ['data:image/jpeg;base64,' + base64.b64encode(buf).decode('ascii')
+                 for buf in encoded]
+    rgb_frames = [cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) for frame in frames]
+    ingest = FrameIngest(args.decode_scale)
+    rgb_buffers = {}
+
+    def decode_base64(data_url):
+        return base64.b64decode(data_url.split(',')[-1])
+
+    def imdecode(buffer):
+        return cv2.imdecode(np.frombuffer(buffer, np.uint8), cv2.IMREAD_COLOR)
+
+    def cvt_color(frame):
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+    def cvt_color_reuse(frame):
+        # Como HandDetector.find_hands_array: buffer de salida reutilizado
+        buffer = rgb_buffers.get(frame.shape)
+        if buffer is None:
+            buffer = rgb_buffers[frame.shape] = np.empty_like(frame)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buffer)
+
+    detector = HandDetector(model_complexity=args.model_complexity, max_num_hands=args.hands)
+
+    def hands_process(rgb):
+        return detector.hands.process(rgb)
+
+    image_shape = frames[0].shape[:2]
+    mp_results = [synthetic_results(args.hands, seed) for seed in range(8)]
+    results = [HandDetector.extract_result(r, image_shape) for r in mp_results]
+    coordinates = [[list(map(tuple, hand)) for hand in r.landmarks.tolist()] for r in results]
+
+    def extract(mp_result):
+        return HandDetector.extract_result(mp_result, image_shape)
+
+    def pixel_coordinates(hands):
+        return [HandDetector.get_pixel_coordinates(hand, image_shape) for hand in hands]
+
+    def to_pixels(result):
+        return HandDetector.to_pixels(result.landmarks, result.image_shape)
+
+    def serialize_json(result):
+        return json.dumps(result_to_json(result))
+
+    stages = [
+        ("base64_decode", decode_base64, data_urls, args.repeat),
+        ("imdecode", imdecode, encoded, args.repeat),
+        (f"imdecode_reduced_{args.decode_scale}", ingest.decode_rgb, encoded, args.repeat),
+        ("cvtColor", cvt_color, frames, args.repeat),
+        ("cvtColor_reuse", cvt_color_reuse, frames, args.repeat),
+        ("hands_process", hands_process, rgb_frames, args.process_repeat),
+        ("extract_result", extract, mp_results, args.repeat),
+        ("get_pixel_coordinates", pixel_coordinates, coordinates, args.repeat),
+        ("to_pixels", to_pixels, results, args.repeat),
+        ("serialize_json", serialize_json, results, args.repeat),
+        ("encode_compact", encode_compact, results, args.repeat),
+    ]
+    frame_info = {
+        "count": len(frames),
+        "shapes": sorted({frame.shape for frame in frames}),
+        "jpeg_bytes_mean": float(np.mean([len(buf) for buf in encoded]))
+    }
+    return stages, frame_info, detector
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+                              ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(frames, source, args):
+    stages, frame_info, detector = build_stages(frames, args)
+    frame_info["source"] = source
+    report = {}
+    try:
+        for name, fn, inputs, repeat in stages:
+            times = time_stage(fn, inputs, repeat, args.warmup)
+            stats = summarize(times)
+            stats["alloc"] = measure_allocations(fn, inputs, min(repeat, args.alloc_calls))
+            report[name] = stats
+            print(f"  {name:<24} p50 {stats['p50']:8.3f} ms  p95 {stats['p95']:8.3f} ms  "
+                  f"p99 {stats['p99']:8.3f} ms  pico {stats['alloc']['peak_bytes_p50'] / 1024:9.1f} KiB")
+    finally:
+        detector.close()
+    return {"frames": frame_info, "stages": report}
+
+
+def compare(report, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nComparación con {baseline_path} (commit {baseline['meta'].get('commit')}):")
+    for source, run in report["runs"].items():
+        previous = baseline["runs"].get(source)
+        if previous is None:
+            continue
+        print(f" {source}:")
+        for name, stats in run["stages"].items():
+            old = previous["stages"].get(name)
+            if old is None:
+                continue
+            ratios = "  ".join(f"p{p} {stats[f'p{p}'] / old[f'p{p}']:5.2f}x"
+                               for p in PERCENTILES if old[f'p{p}'] > 0)
+            print(f"  {name:<24} {ratios}")
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='640x480,1280x720',
+                        help="Tamaños de los frames sintéticos, p. ej. 640x480,1280x720")
+    parser.add_argument('--synthetic', type=int, default=16, help="Número de frames sintéticos")
+    parser.add_argument('--frames', help="Directorio de imágenes o archivo de video grabado")
+    parser.add_argument('--max-frames', type=int, default=200, help="Máximo de frames grabados")
+    parser.add_argument('--repeat', type=int, default=500, help="Llamadas medidas por etapa")
+    parser.add_argument('--process-repeat', type=int, default=60,
+                        help="Llamadas medidas de Hands.process, la etapa más lenta")
+    parser.add_argument('--warmup', type=int, default=5, help="Llamadas previas sin medir")
+    parser.add_argument('--alloc-calls', type=int, default=20,
+                        help="Llamadas por etapa bajo tracemalloc")
+    parser.add_argument('--hands', type=int, default=2, help="Manos en los resultados sintéticos")
+    parser.add_argument('--jpeg-quality', type=int, default=80, help="Calidad JPEG, como el cliente")
+    parser.add_argument('--decode-scale', type=int, default=2, help="Escala de FrameIngest")
+    parser.add_argument('--model-complexity', type=int, default=1, help="Complejidad del modelo")
+    parser.add_argument('--output', default='benchmark.json', help="Archivo JSON de resultados")
+    parser.add_argument('--compare', help="Resultados previos con los que comparar")
+    args = parser.parse_args()
+
+    # Solo CPU y resultados reproducibles
+    cv2.ocl.setUseOpenCL(False)
+
+    runs = {}
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    sources = [("synthetic", lambda: synthetic_frames(sizes, args.synthetic))]
+    if args.frames:
+        sources.append(("recorded", lambda: recorded_frames(args.frames, args.max_frames)))
+    for source, load in sources:
+        frames = load()
+        print(f"Frames {source}: {len(frames)}")
+        runs[source] = run_benchmarks(frames, source, args)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "mediapipe": mp.__version__,
+            "args": vars(args)
+        },
+        "runs": runs
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados guardados en {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,8 +2,16 @@ import cv2
 import numpy as np
 import random
 import os
+import sys
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app.services.capture import CaptureSource, parse_source
+from app.services.compositor import Compositor, Sprite
+
+# Cámara a usar: índice, o un archivo de video como argumento
+CAMERA = parse_source(sys.argv[1]) if len(sys.argv) > 1 else 0
+
 # Configuración de velocidades
 MOVEMENT_SPEED = 5.0  # Velocidad de movimiento de las imágenes
 MIN_CHANGE_INTERVAL = 0.3  # Tiempo mínimo entre cambios de imagen
@@ -78,23 +86,29 @@ def load_overlay_images(directory, desired_size=(100, 100)):
 def main():
     num_images = 7
 
-    cap = cv2.VideoCapture(0)
-
-    if not cap.isOpened():
+    # Lectura de la cámara en segundo plano, siempre con el último frame
+    try:
+        cap = CaptureSource(CAMERA, loop=True)
+    except IOError:
         print("Error: No se pudo abrir la cámara")
         return
 
-    ret, frame = cap.read()
-    if not ret:
+    captured = cap.read(timeout=5.0)
+    if captured is None:
         print("Error: No se pudo leer el frame")
+        cap.close()
         return
 
-    height, width = frame.shape[:2]
+    height, width = captured.image.shape[:2]
 
     overlays = load_overlay_images('../app/static/img/balloons')
     if not overlays:
         print("No se encontraron imágenes. Usando formas de colores.")
 
+    # Alfa premultiplicado una sola vez por imagen
+    sprites = [Sprite(overlay) for overlay in overlays]
+    compositor = Compositor()
+
     moving_images = []
     image_size = overlays[0].shape[:2]
 
@@ -106,18 +120,17 @@ def main():
         direction = random.choice(INITIAL_DIRECTION)
 
         moving_images.append(MovingImage(
-            overlays[0],
+            sprites[0],
             (x, y),
             direction,
-            overlays
+            sprites
         ))
 
     while True:
-        ret, frame = cap.read()
-        if not ret:
+        captured = cap.read()
+        if captured is None:
             break
-
-        frame_bgra = cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+        frame = captured.image
 
         for img in moving_images:
             # Actualizar posición
@@ -137,35 +150,21 @@ def main():
             # Actualizar imagen
             img.update_image()
 
-            # Dibujar imagen
-            frame_bgra = overlay_image(frame_bgra, img.image,
-                                       (int(img.position[0]), int(img.position[1])))
+        # Dibujar todas las imágenes directamente sobre el frame BGR
+        compositor.draw_all(
+            frame,
+            [img.image for img in moving_images],
+            [(int(img.position[0]), int(img.position[1])) for img in moving_images]
+        )
 
-        frame_final = cv2.cvtColor(frame_bgra, cv2.COLOR_BGRA2BGR)
-        cv2.imshow('Multiple Moving Images', frame_final)
+        cv2.imshow('Multiple Moving Images', frame)
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
-    cap.release()
+    cap.close()
     cv2.destroyAllWindows()
 
-def overlay_image(background, foreground, position):
-    bh, bw = background.shape[:2]
-    fh, fw = foreground.shape[:2]
-    x, y = position
-
-    x = max(0, min(x, bw - fw))
-    y = max(0, min(y, bh - fh))
-
-    alpha = foreground[:, :, 3] / 255.0
-
-    for c in range(3):
-        background[y:y+fh, x:x+fw, c] = background[y:y+fh, x:x+fw, c] * (1 - alpha) + \
-                                        foreground[:, :, c] * alpha
-
-    return background
-
 if __name__ == "__main__":
     from math import sqrt
     main()
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Replay a recorded landmark log (.hlog) through the gesture and game code,
+without a camera.
+
+Logs are written by the server with FLASK_HAND_RECORD_DIR set, one per
+session. The game advances at its tick rate on the recorded timeline:
+
+    python test/replay.py recordings/abc123.hlog              # tiempo real
+    python test/replay.py recordings/abc123.hlog --speed 4    # 4x
+    python test/replay.py recordings/abc123.hlog --speed 0 --repeat 50
+
+--speed 0 replays as fast as possible, for load-testing the game logic.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from app.services.game_sessions import GameSession
+from app.services.gestures import compute_gestures
+from app.services.landmark_log import LandmarkLog, replay
+
+# Nombres de los colores de los globos, en el orden de los sprites
+COLORES = ['Rojo', 'Azul', 'Amarrillo', 'Rosa', 'Verde']
+
+
+def replay_game(log, speed, tick_rate, seed):
+    game = GameSession('replay', duration=float('inf'), seed=seed)
+    dt = 1.0 / tick_rate
+    frames = closed = 0
+    for offset, result in replay(log, speed):
+        # Avanzar el juego hasta el instante del frame grabado
+        while game.elapsed + dt <= offset:
+            game.step(dt)
+        game.update_hands(result)
+        closed += int(np.count_nonzero(game.closed))
+        frames += 1
+    return game, frames, closed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('log', help='archivo .hlog')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='velocidad de reproducción, 0 = lo más rápido posible')
+    parser.add_argument('--repeat', type=int, default=1, help='repeticiones del log completo')
+    parser.add_argument('--tick-rate', type=float, default=30.0)
+    parser.add_argument('--seed', type=int, default=0, help='semilla del juego, para repetir partidas')
+    args = parser.parse_args()
+
+    log = LandmarkLog(args.log)
+    if not len(log):
+        sys.exit('el log está vacío')
+    timestamps = log.records['timestamp']
+    hands = log.records['n_hands']
+    print('%d frames, %.1f s grabados, %d con manos' % (len(log), timestamps[-1] - timestamps[0],
+                                                       np.count_nonzero(hands)))
+
+    # Gestos de todo el log de una vez, directamente sobre el memmap
+    start = time.perf_counter()
+    for index in range(len(log)):
+        result = log.result(index)
+        compute_gestures(result.landmarks, result.image_shape)
+    print('gestos: %.1f us/frame' % ((time.perf_counter() - start) / len(log) * 1e6))
+
+    for run in range(args.repeat):
+        start = time.perf_counter()
+        game, frames, closed = replay_game(log, args.speed, args.tick_rate, args.seed)
+        elapsed = time.perf_counter() - start
+        captured = ', '.join('%s: %d' % (COLORES[i % len(COLORES)], n) for i, n in enumerate(game.captured))
+        print('[%d] %d frames, %d ticks en %.2f s (%.0f frames/s), manos cerradas %d | %s'
+              % (run + 1, frames, game.tick, elapsed, frames / elapsed, closed, captured))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# test/ tiene un app.py propio; el paquete app se importa desde la raíz
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
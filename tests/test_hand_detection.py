@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+SERVICES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'services')
+
+# Como test_hand.py: ejecutado desde app/services, sin el paquete app en sys.path
+DRAW_SCRIPT = """
+import sys
+sys.path = [p for p in sys.path if p not in ('', {root!r})]
+sys.path.insert(0, '.')
+import numpy as np
+from hand_detection import HandDetector, HandResult
+
+landmarks = np.full((1, 21, 3), 0.5, dtype=np.float32)
+result = HandResult(landmarks, np.zeros(1, np.uint8), np.ones(1, np.float32), (48, 64))
+img = np.zeros((48, 64, 3), np.uint8)
+drawn = HandDetector.draw_hands(img, result)
+assert drawn.any() and not img.any()
+print('ok')
+"""
+
+
+def test_draw_hands_outside_package():
+    root = os.path.abspath(os.path.join(SERVICES, '..', '..'))
+    env = {key: value for key, value in os.environ.items() if key != 'PYTHONPATH'}
+    output = subprocess.run([sys.executable, '-c', DRAW_SCRIPT.format(root=root)], cwd=SERVICES,
+                            env=env, capture_output=True, text=True, timeout=120)
+    assert output.returncode == 0, output.stderr
+    assert output.stdout.strip().endswith('ok')
+
+
+def mediapipe_results(labels):
+    # Salida de Hands.process con una mano por etiqueta; None sin clasificación
+    from types import SimpleNamespace
+    point = SimpleNamespace(x=0.5, y=0.5, z=0.0)
+    hands = [SimpleNamespace(landmark=[point] * 21) for _ in labels]
+    handedness = [SimpleNamespace(classification=[SimpleNamespace(label=label, score=0.9)])
+                  for label in labels if label is not None]
+    return SimpleNamespace(multi_hand_landmarks=hands, multi_handedness=handedness or None)
+
+
+def test_missing_handedness_is_unknown():
+    from app.routes.hand_api import result_to_json
+    from app.services.hand_detection import HandDetector
+    from app.services.landmark_codec import decode_compact, encode_compact
+
+    assert HandDetector.extract_result(mediapipe_results(['Right', 'Left']), (48, 64)).hand_types == ['Right', 'Left']
+    result = HandDetector.extract_result(mediapipe_results([None]), (48, 64))
+    assert result.hand_types == [None]
+    assert result_to_json(result)['hand_types'] == [None]
+    assert decode_compact(encode_compact(result))[0].hand_types == [None]
@@ -0,0 +1,64 @@
+import numpy as np
+
+from app.services.hand_detection import HandResult, NUM_LANDMARKS
+from app.services.hand_tracking import HandTracker
+from app.services.quality import QualityLevel
+
+
+class FakeDetector:
+    # Detector de prueba: una mano fija en el centro, cuenta las llamadas
+    model_complexity = 1
+    max_num_hands = 2
+    min_detection_confidence = 0.5
+
+    def __init__(self):
+        self.calls = []
+
+    def find_hands_array(self, img, rgb=True):
+        self.calls.append(img.shape[:2])
+        landmarks = np.full((1, NUM_LANDMARKS, 3), 0.5, np.float32)
+        landmarks[0, :, 0] += np.linspace(-0.05, 0.05, NUM_LANDMARKS)
+        return HandResult(landmarks, np.zeros(1, np.uint8), np.ones(1, np.float32), img.shape[:2])
+
+    def reconfigure(self, model_complexity=None, max_num_hands=None):
+        return True
+
+    def close(self):
+        pass
+
+
+class StepDown:
+    # Controlador de calidad que baja al nivel con escala 2 en la llamada indicada
+    index = 0
+
+    def __init__(self, at):
+        self.at = at
+        self.updates = 0
+
+    def update(self, latency, timestamp):
+        self.updates += 1
+        if self.updates == self.at:
+            self.index = 1
+            return QualityLevel(0, 2, 2)
+        return None
+
+
+def test_scale_change_restarts_tracking():
+    full, roi = FakeDetector(), FakeDetector()
+    tracker = HandTracker(detector=full, motion_threshold=10.0, roi_margin=0.5)
+    tracker.roi_detector = roi
+    tracker.quality = StepDown(at=2)
+    img = np.full((720, 1280, 3), 100, np.uint8)
+
+    tracker.find_hands_array(img, 0.0)
+    tracker.find_hands_array(img + 40, 0.1)
+    assert len(roi.calls) == 1
+    assert tracker.ingest.scale == 2
+
+    # El mismo contenido a la mitad de resolución: no se reutiliza el resultado
+    # anterior ni se recorta con el ROI de la escala vieja
+    result = tracker.find_hands_array(np.full((360, 640, 3), 140, np.uint8), 0.2)
+    assert full.calls[-1] == (360, 640)
+    assert len(roi.calls) == 1
+    assert result.image_shape == (360, 640)
+    assert tracker.static_frames == 0
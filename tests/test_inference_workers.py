@@ -0,0 +1,47 @@
+import time
+
+import cv2
+import numpy as np
+
+from app.services.detector_pool import tracker_factory
+from app.services.inference_workers import InferenceService
+
+
+def jpeg():
+    ok, buffer = cv2.imencode('.jpg', np.full((240, 320, 3), 100, np.uint8))
+    return buffer.tobytes()
+
+
+def test_dead_worker_is_restarted():
+    service = InferenceService(num_workers=1, timeout=30.0, factory=tracker_factory)
+    try:
+        assert service.find_hands_encoded('a', jpeg()) is not None
+        stats = service.stats(timeout=10.0)
+        assert stats[0]['trackers'][0]['frames'] == 1
+
+        # El proceso muere: la siguiente petición lo reemplaza en el mismo hueco
+        old = service._workers[0]
+        old.process.kill()
+        old.process.join()
+        assert service.find_hands_encoded('a', jpeg()) is not None
+        assert service._workers[0] is not old
+        assert service.restarts == 1
+        # La sesión empieza de cero en el nuevo proceso
+        assert service.stats(timeout=10.0)[0]['trackers'][0]['frames'] == 1
+    finally:
+        service.close()
+
+
+def test_dead_worker_is_replaced_while_idle():
+    service = InferenceService(num_workers=1, timeout=30.0, factory=tracker_factory)
+    try:
+        old = service._workers[0]
+        old.process.kill()
+        old.process.join()
+        deadline = time.monotonic() + 5.0
+        while service._workers[0] is old and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert service._workers[0] is not old
+        assert service._workers[0].process.is_alive()
+    finally:
+        service.close()
@@ -0,0 +1,33 @@
+import numpy as np
+
+from app.services.gestures import compute_gestures
+from app.services.hand_detection import HandResult, NUM_LANDMARKS
+from app.services.landmark_codec import decode_compact, encode_compact
+
+
+def random_result(n_hands):
+    rng = np.random.default_rng(n_hands)
+    landmarks = rng.uniform(0.1, 0.9, (n_hands, NUM_LANDMARKS, 3)).astype(np.float32)
+    handedness = (np.arange(n_hands) % 2).astype(np.uint8)
+    scores = rng.uniform(0.5, 1.0, n_hands).astype(np.float32)
+    return HandResult(landmarks, handedness, scores, (720, 1280))
+
+
+def test_compact_round_trip_carries_gestures():
+    result = random_result(2)
+    decoded, gestures = decode_compact(encode_compact(result))
+    expected = compute_gestures(result.landmarks, result.image_shape)
+
+    np.testing.assert_allclose(decoded.landmarks, result.landmarks, atol=1e-4)
+    assert decoded.hand_types == result.hand_types
+    # Los gestos viajan con el formato compacto igual que en la respuesta JSON
+    np.testing.assert_array_equal(gestures.extended, expected.extended)
+    np.testing.assert_array_equal(gestures.closed, expected.closed)
+    np.testing.assert_allclose(gestures.pinch, expected.pinch, atol=1e-3)
+    np.testing.assert_allclose(gestures.palm_center, expected.palm_center, atol=1e-4)
+
+
+def test_compact_without_hands():
+    decoded, gestures = decode_compact(encode_compact(random_result(0)))
+    assert len(decoded.landmarks) == 0
+    assert gestures.extended.shape == (0, 5)
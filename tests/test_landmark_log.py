@@ -0,0 +1,29 @@
+import os
+
+import numpy as np
+
+from app.services.hand_detection import HandResult, NUM_LANDMARKS
+from app.services.landmark_log import LandmarkLog, SessionRecorders
+
+
+def one_hand():
+    return HandResult(np.zeros((1, NUM_LANDMARKS, 3), np.float32), np.zeros(1, np.uint8),
+                      np.ones(1, np.float32), (480, 640))
+
+
+def test_long_session_id_gets_a_short_file_name(tmp_path):
+    recorders = SessionRecorders(str(tmp_path))
+    # Un ID más largo que el límite de nombres del sistema de archivos
+    session_id = 'x' * 5000
+    recorders.record(session_id, one_hand())
+    recorders.close_all()
+    path = recorders.path(session_id)
+    assert len(os.path.basename(path)) < 255
+    assert len(LandmarkLog(path)) == 1
+
+
+def test_sanitized_ids_do_not_share_a_log(tmp_path):
+    recorders = SessionRecorders(str(tmp_path))
+    assert recorders.path('a/b') != recorders.path('a_b')
+    assert recorders.path('a/b') == recorders.path('a/b')
+    assert os.path.basename(recorders.path('a_b')) == 'a_b.hlog'
@@ -0,0 +1,38 @@
+import numpy as np
+
+from app.services.motion_gate import MotionGate, MotionGateStats
+
+
+def frame(rng, patch=None, size=150, level=80):
+    # Fondo con ruido de cámara, opcionalmente con un parche más claro
+    img = np.clip(rng.normal(100, 4, (720, 1280, 3)), 0, 255).astype(np.uint8)
+    if patch is not None:
+        x, y = patch
+        img[y:y + size, x:x + size] = np.clip(img[y:y + size, x:x + size].astype(int) + level, 0, 255)
+    return img
+
+
+def gate_after(reference):
+    gate = MotionGate(stats=MotionGateStats())
+    gate.is_static(reference, 0.0)
+    gate.accept()
+    return gate
+
+
+def test_noise_is_static():
+    rng = np.random.default_rng(0)
+    gate = gate_after(frame(rng))
+    assert all(gate.is_static(frame(rng), t) for t in (0.1, 0.2, 0.3))
+
+
+def test_small_moving_patch_is_not_static():
+    rng = np.random.default_rng(1)
+    gate = gate_after(frame(rng, (400, 300)))
+    # Un parche del tamaño de una mano que se desplaza unos pocos píxeles
+    assert not gate.is_static(frame(rng, (440, 300)), 0.1)
+
+
+def test_small_patch_appearing_is_not_static():
+    rng = np.random.default_rng(2)
+    gate = gate_after(frame(rng))
+    assert not gate.is_static(frame(rng, (600, 200), size=80), 0.1)